@@ -10,6 +10,8 @@ class Assignment:
                               each player is assigned no more cards than they can have in their hand
                               the secret envelope has at most one card of each catagory
                               the leftover cards are always assigned if there are any
+    While a checkpoint is pushed, every change is logged on a trail, so rollback can undo
+    everything since the last checkpoint in time proportional to the number of changes.
     """
     def __init__(self, num_players, card_to_catagory):
         self._num_players = num_players
@@ -20,6 +22,13 @@ class Assignment:
         self._hand_size = self._num_cards_in_play // num_players
         self._num_leftover_cards = self._num_cards_in_play % num_players
         self._card_to_assignment = [None for _ in range(self._num_cards)]
+        # Cards currently given each assignment, so occupancy is a len() instead of a scan
+        self._assignment_to_cards = {i:set() for i in range(-1, num_players + 1)}
+        # The card assigned to the secret envelope for each catagory, or None
+        self._secret_by_catagory = {catagory:None for catagory in set(card_to_catagory)}
+        # (card, previous assignment) for each change since the first checkpoint, None if there is no checkpoint
+        self._trail = None
+        self._checkpoints = []
     def try_assign(self, card: int, assignment: int):
         # Try to assign card a given assignment, return True is successful, False otherwise
         assert card >= 0 and card < self._num_cards, "Invalid card index given"
@@ -27,26 +36,66 @@ class Assignment:
         # Based on what assignment is given, different checks must be performed
         if assignment == -1:
             # No more than self._num_leftover_cards can be assigned as leftover cards
-            if len([None for a in self._card_to_assignment if a == -1]) == self._num_leftover_cards:
+            if len(self._assignment_to_cards[-1]) == self._num_leftover_cards:
                 return False
         elif assignment == 0:
             # A card can't be assigned to the secret envelope if a card with the same catagory 
             # is already assigned there
-            for c, a in enumerate(self._card_to_assignment):
-                if a == 0 and self._card_to_catagory[card] == self._card_to_catagory[c]:
-                    return False
+            if self._secret_by_catagory[self._card_to_catagory[card]] != None:
+                return False
         else:
             # No more than self._hand_size cards can be assigned a players hand
-            if len([None for a in self._card_to_assignment if a == assignment]) == self._hand_size:
+            if len(self._assignment_to_cards[assignment]) == self._hand_size:
                 return False
-        self._card_to_assignment[card] = assignment
+        if self._trail != None:
+            self._trail.append((card, self._card_to_assignment[card]))
+        self._set(card, assignment)
         return True
     def deassign(self, card: int):
         # Deassign the given card from its assignment, this always perserves validity
         # because the limits are all upper bounds.
         assert card >= 0 and card < self._num_cards, "Invalid card index given"
-        self._card_to_assignment[card] = None
+        assignment = self._card_to_assignment[card]
+        if assignment == None:
+            return
+        if self._trail != None:
+            self._trail.append((card, assignment))
+        self._set(card, None)
+    def _set(self, card, assignment):
+        # Assign card without any checks or logging
+        old = self._card_to_assignment[card]
+        if old != None:
+            self._assignment_to_cards[old].discard(card)
+            if old == 0:
+                self._secret_by_catagory[self._card_to_catagory[card]] = None
+        self._card_to_assignment[card] = assignment
+        if assignment != None:
+            self._assignment_to_cards[assignment].add(card)
+            if assignment == 0:
+                self._secret_by_catagory[self._card_to_catagory[card]] = card
+    def push_checkpoint(self):
+        # Start a checkpoint that rollback will return to
+        if self._trail == None:
+            self._trail = []
+        self._checkpoints.append(len(self._trail))
+    def rollback(self):
+        # Undo every change since the last checkpoint and remove that checkpoint
+        assert len(self._checkpoints) > 0, "Assignment rolled back without a checkpoint"
+        mark = self._checkpoints.pop()
+        while len(self._trail) > mark:
+            card, assignment = self._trail.pop()
+            self._set(card, assignment)
+        if len(self._checkpoints) == 0:
+            self._trail = None
+    def assignment_of(self, card: int):
+        # Return the assignment of the given card, or None if it is unassigned
+        assert card >= 0 and card < self._num_cards, "Invalid card index given"
+        return self._card_to_assignment[card]
+    def num_with_assignment(self, assignment: int) -> int:
+        # Return how many cards have a given assignment
+        assert assignment >= -1 and assignment <= self._num_players, "Invalid assignment type given"
+        return len(self._assignment_to_cards[assignment])
     def cards_with_assignment(self, assignment: int):
         # Return list of all cards with a given assignment
         assert assignment >= -1 and assignment <= self._num_players, "Invalid assignment type given"
-        return [c for c, a in enumerate(self._card_to_assignment) if a == assignment]
\ No newline at end of file
+        return sorted(self._assignment_to_cards[assignment])
\ No newline at end of file
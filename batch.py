@@ -0,0 +1,137 @@
+import numpy as np
+
+class BatchTableau:
+    """
+    A BatchTableau holds the grids of many games with the same number of players and cards,
+    for deducing all of them at once.
+    The grids are one int8 array of shape (games, locations, cards), where location l of a
+    Tableau is index l + 1, so the leftover cards are index 0 and the secret envelope index 1.
+    Conditions are an int16 array of shape (games, players, conditions, 3) of card indexes, padded
+    with -1, where player p is index p - 1.
+    update applies the rules of Tableau.update without satisfy_collective to every game on each sweep:
+        - a card known to be in one location is ruled out everywhere else
+        - the leftover and player columns, from iterate_leftover and iterate_players
+        - each catagory of the secret envelope column, from iterate_secret
+        - each card row, from iterate_cards
+        - conditions with one card left that isn't ruled out, from satisfy_players
+    as reductions over rows, columns and catagories of the whole array, until no game changes.
+    The result for every game is the same as Tableau.update with a collective_node_budget of 0.
+    A game given contradictory information is marked as not valid, where Tableau would raise
+    an AssertionError, and is left alone from then on.
+    """
+    def __init__(self, num_games, num_players, card_to_catagory, max_conditions = 16):
+        self._num_games = num_games
+        self._num_players = num_players
+        self._card_to_catagory = card_to_catagory
+        self._num_cards = len(card_to_catagory)
+        self._num_catagories = len(set(card_to_catagory))
+        self._num_cards_in_play = self._num_cards - self._num_catagories
+        self._hand_size = self._num_cards_in_play // num_players
+        self._num_leftover_cards = self._num_cards_in_play % num_players
+        self.grid = np.zeros((num_games, num_players + 2, self._num_cards), dtype = np.int8)
+        self.conditions = np.full((num_games, num_players, max_conditions, 3), -1, dtype = np.int16)
+        self.num_conditions = np.zeros((num_games, num_players), dtype = np.int32)
+        self.valid = np.ones(num_games, dtype = bool)
+        # catagories[k, c] is True when card c is in catagory k
+        self._catagories = np.array([[self._card_to_catagory[c] == k for c in range(self._num_cards)]
+                                     for k in range(self._num_catagories)])
+        # how many cards each column other than the secret envelope holds
+        self._columns = np.array([0] + list(range(2, num_players + 2)))
+        self._capacity = np.array([self._num_leftover_cards] + [self._hand_size] * num_players)
+    @classmethod
+    def from_tableaux(cls, tableaux):
+        # Builds a BatchTableau from the grids and conditions of Tableaus with the same setup
+        first = tableaux[0]
+        batch = cls(len(tableaux), first._num_players, first._card_to_catagory)
+        for game, tableau in enumerate(tableaux):
+            for l in range(-1, first._num_players + 1):
+                for c in range(first._num_cards):
+                    batch.grid[game, l + 1, c] = tableau.check_grid(l, c)
+            for p, clauses in tableau.open_conditions().items():
+                for clause in clauses:
+                    batch.add_condition(game, p, clause)
+        return batch
+    def add_entry(self, game, location, card, state):
+        # Set a point on a game's grid, rules are only applied by update
+        assert state in (-1, 1), "Invalid state given to BatchTableau"
+        current = self.grid[game, location + 1, card]
+        if current == -state:
+            self.valid[game] = False
+        elif current == 0:
+            self.grid[game, location + 1, card] = state
+    def add_condition(self, game, player, cards):
+        # Record that player has at least one of cards in their hand in a game
+        assert len(cards) <= 3, "Conditions in a BatchTableau have at most 3 cards"
+        i = self.num_conditions[game, player - 1]
+        if i == self.conditions.shape[2]:
+            padding = np.full(self.conditions.shape[:2] + (self.conditions.shape[2],) + (3,), -1, dtype = np.int16)
+            self.conditions = np.concatenate([self.conditions, padding], axis = 2)
+        self.conditions[game, player - 1, i, :len(cards)] = cards
+        self.num_conditions[game, player - 1] = i + 1
+    def check_grid(self, game, location, card):
+        return int(self.grid[game, location + 1, card])
+    def update(self):
+        # Sweeps every rule over every game until no game changes, returns the number of sweeps
+        sweeps = 0
+        while True:
+            sweeps += 1
+            before = self.grid.copy()
+            bad = np.zeros(self._num_games, dtype = bool)
+            bad |= self._sweep_rows()
+            bad |= self._sweep_columns()
+            bad |= self._sweep_secret()
+            bad |= self._sweep_cards()
+            bad |= self._sweep_conditions()
+            self.valid &= ~bad
+            # games found to be contradictory keep the grid they had before the sweep
+            self.grid[~self.valid] = before[~self.valid]
+            if not (self.grid != before).any():
+                return sweeps
+    def _sweep_rows(self):
+        # A card known to be in one location is ruled out of every other location
+        known_in = (self.grid == 1).sum(axis = 1)
+        self.grid[(self.grid == 0) & (known_in == 1)[:, None, :]] = -1
+        return (known_in > 1).any(axis = 1)
+    def _sweep_columns(self):
+        # Leftover and player columns, filled in once the open or definite cards match the column's size
+        columns = self.grid[:, self._columns, :]
+        open_cards = (columns != -1).sum(axis = 2)
+        definite = (columns == 1).sum(axis = 2)
+        fill_in = open_cards == self._capacity
+        fill_out = (definite == self._capacity) & ~fill_in
+        columns[(columns == 0) & fill_in[:, :, None]] = 1
+        columns[(columns == 0) & fill_out[:, :, None]] = -1
+        self.grid[:, self._columns, :] = columns
+        return ((open_cards < self._capacity) | (definite > self._capacity)).any(axis = 1)
+    def _sweep_secret(self):
+        # Each catagory of the secret envelope column has exactly one card
+        secret = self.grid[:, 1, :]
+        open_cards = (secret != -1).astype(np.int32) @ self._catagories.T
+        definite = (secret == 1).astype(np.int32) @ self._catagories.T
+        fill_in = (open_cards == 1) @ self._catagories
+        fill_out = ((definite == 1) & (open_cards != 1)) @ self._catagories
+        secret[(secret == 0) & fill_in] = 1
+        secret[(secret == 0) & fill_out] = -1
+        return ((open_cards == 0) | (definite > 1)).any(axis = 1)
+    def _sweep_cards(self):
+        # A card with only one location left is in that location
+        open_locations = (self.grid != -1).sum(axis = 1)
+        self.grid[(self.grid == 0) & (open_locations == 1)[:, None, :]] = 1
+        return (open_locations == 0).any(axis = 1)
+    def _sweep_conditions(self):
+        # A condition with every card but one ruled out means the player has that card
+        if self.conditions.shape[2] == 0:
+            return np.zeros(self._num_games, dtype = bool)
+        real = self.conditions >= 0
+        cards = np.where(real, self.conditions, 0)
+        games = np.arange(self._num_games)[:, None, None, None]
+        players = np.arange(self._num_players)[None, :, None, None] + 2
+        values = self.grid[games, players, cards]
+        satisfied = ((values == 1) & real).any(axis = 3)
+        open_cards = (values != -1) & real
+        num_open = open_cards.sum(axis = 3)
+        active = real.any(axis = 3) & ~satisfied
+        game, player, condition = np.nonzero(active & (num_open == 1))
+        card = cards[game, player, condition, open_cards[game, player, condition].argmax(axis = 1)]
+        self.grid[game, player + 2, card] = 1
+        return (active & (num_open == 0)).any(axis = (1, 2))
@@ -0,0 +1 @@
+# Benchmarks for the Tableau deduction engine, run with python -m benchmarks.run
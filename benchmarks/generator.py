@@ -0,0 +1,53 @@
+import random
+from tracker import card_to_catagory as clue_card_to_catagory
+
+def deal_cards(num_players, card_to_catagory, rng):
+    # Returns a list giving the location of each card in a random deal
+    num_cards = len(card_to_catagory)
+    num_catagories = len(set(card_to_catagory))
+    num_cards_in_play = num_cards - num_catagories
+    hand_size = num_cards_in_play // num_players
+    cards = list(range(num_cards))
+    rng.shuffle(cards)
+    deal = [None for _ in range(num_cards)]
+    for catagory in range(num_catagories):
+        deal[next(c for c in cards if card_to_catagory[c] == catagory)] = 0
+    rest = [c for c in cards if deal[c] == None]
+    for i, card in enumerate(rest):
+        deal[card] = i // hand_size + 1 if i < hand_size * num_players else -1
+    return deal
+
+def generate_game(num_players, seed, num_suggestions = 30, player = 1, card_to_catagory = clue_card_to_catagory):
+    # Returns a synthetic game in the format read by replay.py, along with the deal it was played from.
+    # Players take turns suggesting one random card of each catagory, and the first player after the
+    # suggester holding one of them shows a card, which player only sees when they are the suggester.
+    rng = random.Random(seed)
+    deal = deal_cards(num_players, card_to_catagory, rng)
+    num_cards = len(card_to_catagory)
+    by_catagory = {}
+    for c in range(num_cards):
+        by_catagory.setdefault(card_to_catagory[c], []).append(c)
+    game = {"id": f"synthetic-{num_players}-{seed}", "num_players": num_players, "player": player,
+            "hand": [c for c in range(num_cards) if deal[c] == player],
+            "leftover": [c for c in range(num_cards) if deal[c] == -1],
+            "suggestions": []}
+    for turn in range(num_suggestions):
+        suggester = turn % num_players + 1
+        cards = [rng.choice(by_catagory[catagory]) for catagory in sorted(by_catagory)]
+        suggestion = {"suggester": suggester, "cards": cards, "passed": []}
+        for i in range(1, num_players):
+            responder = (suggester - 1 + i) % num_players + 1
+            held = [c for c in cards if deal[c] == responder]
+            if len(held) > 0:
+                suggestion["shown_by"] = responder
+                if suggester == player:
+                    suggestion["shown"] = rng.choice(held)
+                break
+            suggestion["passed"].append(responder)
+        game["suggestions"].append(suggestion)
+    return game, deal
+
+def generate_games(count, seed, players = (3, 4, 5, 6), num_suggestions = 30):
+    # Yields count synthetic games, cycling through the given player counts
+    for i in range(count):
+        yield generate_game(players[i % len(players)], seed * 1000003 + i, num_suggestions)
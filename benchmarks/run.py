@@ -0,0 +1,115 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from tableau import Tableau
+from tracker import card_to_catagory as clue_card_to_catagory
+from benchmarks.generator import generate_games
+
+# Methods of Tableau that are timed on every call. The rules are the ones update runs from its queue.
+TIMED_METHODS = ["add_entry_to_grid", "update", "_check_leftover", "_check_secret", "_check_player",
+                 "_check_card", "_satisfy_player", "satisfy_collective"]
+
+def _timed(method, latencies):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+def play_game(game, tableau_options, latencies = None):
+    # Feeds a synthetic game into a new Tableau one turn at a time, updating after every turn.
+    # If latencies is given, every call to a method in TIMED_METHODS is timed into it.
+    tableau = Tableau(game["num_players"], game.get("card_to_catagory", clue_card_to_catagory), **tableau_options)
+    if latencies != None:
+        for name in TIMED_METHODS:
+            setattr(tableau, name, _timed(getattr(tableau, name), latencies.setdefault(name, [])))
+    for card in game["hand"]:
+        tableau.add_entry_to_grid(game["player"], card, 1)
+    for card in game["leftover"]:
+        tableau.add_entry_to_grid(-1, card, 1)
+    tableau.update()
+    for suggestion in game["suggestions"]:
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion["passed"],
+                               suggestion.get("shown_by"), suggestion.get("shown"))
+        tableau.update()
+    return tableau
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(latencies):
+    # Returns count, mean and percentiles in microseconds for each timed method
+    summary = {}
+    for name, times in latencies.items():
+        if len(times) == 0:
+            continue
+        ordered = sorted(times)
+        summary[name] = {"count": len(ordered),
+                         "mean_us": 1e6 * sum(ordered) / len(ordered),
+                         "p50_us": 1e6 * _percentile(ordered, 0.5),
+                         "p90_us": 1e6 * _percentile(ordered, 0.9),
+                         "p99_us": 1e6 * _percentile(ordered, 0.99),
+                         "max_us": 1e6 * ordered[-1]}
+    return summary
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(num_games, seed, players, num_suggestions, tableau_options):
+    # Plays the same synthetic games three times: untimed for throughput, with every
+    # call timed for latencies, and under tracemalloc for peak memory
+    games = [game for game, _ in generate_games(num_games, seed, players, num_suggestions)]
+    start = time.perf_counter()
+    for game in games:
+        play_game(game, tableau_options)
+    elapsed = time.perf_counter() - start
+    latencies = {}
+    for game in games:
+        play_game(game, tableau_options, latencies)
+    tracemalloc.start()
+    for game in games:
+        play_game(game, tableau_options)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"commit": _commit(),
+            "python": platform.python_version(),
+            "config": {"games": num_games, "seed": seed, "players": list(players),
+                       "suggestions": num_suggestions, "tableau": tableau_options},
+            "elapsed_s": elapsed,
+            "games_per_sec": num_games / elapsed if elapsed > 0 else None,
+            "peak_memory_bytes": peak_memory,
+            "latency": summarize(latencies)}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark Tableau deduction on seeded synthetic games")
+    parser.add_argument("-n", "--games", type = int, default = 100, help = "number of games to play")
+    parser.add_argument("-s", "--seed", type = int, default = 0, help = "seed of the game generator")
+    parser.add_argument("-p", "--players", type = int, nargs = "+", default = [3, 4, 5, 6],
+                        help = "player counts to cycle through, from 3 to 6")
+    parser.add_argument("--suggestions", type = int, default = 30, help = "suggestions made in each game")
+    parser.add_argument("--bitset", action = "store_true", help = "use bitset grid storage")
+    parser.add_argument("--node-budget", type = int, default = 20000,
+                        help = "node budget of the deal search for each update, 0 turns it off")
+    parser.add_argument("-o", "--output", default = "bench_output.json", help = "file to write results to as JSON")
+    args = parser.parse_args(argv)
+    assert all(3 <= p <= 6 for p in args.players), "Player counts must be from 3 to 6"
+    results = run(args.games, args.seed, args.players, args.suggestions,
+                  {"bitset": args.bitset, "collective_node_budget": args.node_budget})
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent = 2)
+    print(f"{results['games_per_sec']:.1f} games/sec, peak memory {results['peak_memory_bytes'] / 1024:.0f} KiB")
+    for name, stats in results["latency"].items():
+        print(f"{name:20} {stats['count']:8} calls  p50 {stats['p50_us']:9.1f}us  p99 {stats['p99_us']:9.1f}us  "
+              f"max {stats['max_us']:9.1f}us")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+class ConditionStore:
+    """
+    A ConditionStore holds the conditions on a single player's hand, each one meaning
+    the player has at least one of the cards in it.
+    Conditions are indexed by card in two ways:
+        - every condition containing a card, so that when the card is found to be in the
+          player's hand all of those conditions are dropped as satisfied
+        - the two cards each condition is watching, so that when a card is found to not be
+          in the player's hand only the conditions watching it are looked at
+    A condition watches two cards that aren't known to be out of the player's hand. When a
+    watched card is ruled out, the condition moves its watch to another card that isn't ruled
+    out, and if there is none left the other watched card must be in the player's hand.
+    Those cards are collected as units until they are taken by the Tableau.
+    The store doesn't hold the grid, so callers pass in the player's column state when needed.
+    While a checkpoint is pushed, added conditions and satisfied conditions are logged on a trail
+    so rollback can undo them. Moved watches are left alone, since a rollback only takes cards out
+    of the ruled out set, so every watched card is still one that isn't ruled out.
+    """
+    def __init__(self, num_cards):
+        self._num_cards = num_cards
+        self._clauses = []
+        self._live = []
+        self._watched = []
+        self._num_live = 0
+        self._containing = [[] for _ in range(num_cards)]
+        self._watches = [[] for _ in range(num_cards)]
+        self._units = []
+        # ("add", id) or ("satisfied", id) for each change since the first checkpoint, None if there is no checkpoint
+        self._trail = None
+        self._checkpoints = []
+    def __len__(self):
+        return self._num_live
+    def clauses(self):
+        # Return all conditions that haven't been satisfied yet
+        return [clause for clause, live in zip(self._clauses, self._live) if live]
+    def clear(self):
+        # Drop every condition, as when the player's whole hand is known
+        for cid, live in enumerate(self._live):
+            if live:
+                self._satisfy(cid)
+        self._units = []
+    def _satisfy(self, cid):
+        self._live[cid] = False
+        self._num_live -= 1
+        if self._trail != None:
+            self._trail.append(("satisfied", cid))
+    def add(self, clause, state):
+        # Add a condition, state(card) gives the player's grid value for that card
+        clause = tuple(dict.fromkeys(clause))
+        if any(state(c) == 1 for c in clause):
+            # already satisfied so there is nothing to store
+            return
+        open_cards = [c for c in clause if state(c) != -1]
+        assert len(open_cards) > 0, "In Tableau, a condition that cannot be satisfied has been found"
+        if len(open_cards) == 1:
+            self._units.append(open_cards[0])
+            return
+        cid = len(self._clauses)
+        self._clauses.append(clause)
+        self._live.append(True)
+        self._watched.append([open_cards[0], open_cards[1]])
+        self._num_live += 1
+        for c in clause:
+            self._containing[c].append(cid)
+        self._watches[open_cards[0]].append(cid)
+        self._watches[open_cards[1]].append(cid)
+        if self._trail != None:
+            self._trail.append(("add", cid))
+    def card_in(self, card):
+        # The card is in the player's hand, so every condition containing it is satisfied
+        for cid in self._containing[card]:
+            if self._live[cid]:
+                self._satisfy(cid)
+    def card_out(self, card, state) -> bool:
+        # The card is not in the player's hand, state(card) gives the player's grid value for a card.
+        # Returns true if new units were found
+        watching = self._watches[card]
+        self._watches[card] = []
+        found = False
+        satisfiable = True
+        for cid in watching:
+            if not self._live[cid]:
+                # kept in case a rollback makes it live again
+                self._watches[card].append(cid)
+                continue
+            watched = self._watched[cid]
+            other = watched[1] if watched[0] == card else watched[0]
+            replacement = None
+            for c in self._clauses[cid]:
+                if c != card and c != other and state(c) != -1:
+                    replacement = c
+                    break
+            if replacement != None:
+                watched[watched.index(card)] = replacement
+                self._watches[replacement].append(cid)
+                continue
+            # every card other than the other watched card has been ruled out
+            self._watches[card].append(cid)
+            if state(other) == -1:
+                satisfiable = False
+                continue
+            self._units.append(other)
+            found = True
+        # checked after the loop so that every watch is back in place if it fails
+        assert satisfiable, "In Tableau, a condition that cannot be satisfied has been found"
+        return found
+    def all_met(self, state) -> bool:
+        # True if every condition and unit has a card in the player's hand, state(card) gives the player's grid value
+        return all(state(c) == 1 for c in self._units) and \
+               all(any(state(c) == 1 for c in clause) for clause in self.clauses())
+    def take_units(self):
+        # Return and forget the cards found to be in the player's hand
+        units = self._units
+        self._units = []
+        return units
+    def push_checkpoint(self):
+        # Start a checkpoint that rollback will return to
+        if self._trail == None:
+            self._trail = []
+        self._checkpoints.append((len(self._trail), list(self._units)))
+    def rollback(self):
+        # Undo every change since the last checkpoint and remove that checkpoint
+        assert len(self._checkpoints) > 0, "ConditionStore rolled back without a checkpoint"
+        mark, self._units = self._checkpoints.pop()
+        while len(self._trail) > mark:
+            change, cid = self._trail.pop()
+            if change == "satisfied":
+                self._live[cid] = True
+                self._num_live += 1
+            else:
+                # conditions are undone in the reverse order they were added, so cid is always the last one
+                clause = self._clauses.pop()
+                if self._live.pop():
+                    self._num_live -= 1
+                for c in clause:
+                    self._containing[c].pop()
+                for c in self._watched.pop():
+                    self._watches[c].remove(cid)
+        if len(self._checkpoints) == 0:
+            self._trail = None
@@ -0,0 +1,109 @@
+def _matches(value, condition):
+    return value == condition if type(condition) == int else value in condition
+
+def _bits(mask):
+    # Yield the index of every set bit in mask, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class ListGrid:
+    """
+    The original storage for a Tableau's grid, a dict of lists accessed as grid[col_num][row_num].
+    Every search is a scan over the whole row or column.
+    """
+    def __init__(self, num_players, card_to_catagory):
+        self._num_players = num_players
+        self._card_to_catagory = card_to_catagory
+        self._num_cards = len(card_to_catagory)
+        self._grid = {i:[0 for _ in range(self._num_cards)] for i in range(-1, num_players + 1)}
+    def get(self, location, card):
+        return self._grid[location][card]
+    def set(self, location, card, state):
+        self._grid[location][card] = state
+    def clear(self, location, card):
+        self._grid[location][card] = 0
+    def search_column(self, location, condition):
+        # condition int or tuple of ints
+        return [c for c in range(self._num_cards) if _matches(self._grid[location][c], condition)]
+    def search_row(self, card, condition):
+        # condition int or tuple of ints
+        return [l for l in range(-1, self._num_players + 1) if _matches(self._grid[l][card], condition)]
+    def count_column(self, location, condition, catagory = None):
+        # Number of cards in the column matching condition, optionally only those in the given catagory
+        return len([c for c in range(self._num_cards) if _matches(self._grid[location][c], condition)
+                    and (catagory == None or self._card_to_catagory[c] == catagory)])
+    def count_row(self, card, condition):
+        return len(self.search_row(card, condition))
+
+class BitsetGrid:
+    """
+    Stores a Tableau's grid as integer bitmasks instead of lists.
+    Each column keeps a "known in" and a "known out" mask with bit c set for card c,
+    and each row keeps the same pair of masks with bit l + 1 set for location l.
+    The unknown points of a row or column are whatever is in neither mask, so searches
+    and counts become a few mask operations and a popcount instead of a scan.
+    """
+    def __init__(self, num_players, card_to_catagory):
+        self._num_players = num_players
+        self._card_to_catagory = card_to_catagory
+        self._num_cards = len(card_to_catagory)
+        self._all_cards = (1 << self._num_cards) - 1
+        self._all_locations = (1 << (num_players + 2)) - 1
+        self._catagory_masks = {}
+        for c, catagory in enumerate(card_to_catagory):
+            self._catagory_masks[catagory] = self._catagory_masks.get(catagory, 0) | (1 << c)
+        self._column_in = {i:0 for i in range(-1, num_players + 1)}
+        self._column_out = {i:0 for i in range(-1, num_players + 1)}
+        self._row_in = [0 for _ in range(self._num_cards)]
+        self._row_out = [0 for _ in range(self._num_cards)]
+    def get(self, location, card):
+        bit = 1 << card
+        if self._column_in[location] & bit:
+            return 1
+        if self._column_out[location] & bit:
+            return -1
+        return 0
+    def set(self, location, card, state):
+        # Only ever called on a point that is currently 0
+        if state == 1:
+            self._column_in[location] |= 1 << card
+            self._row_in[card] |= 1 << (location + 1)
+        else:
+            self._column_out[location] |= 1 << card
+            self._row_out[card] |= 1 << (location + 1)
+    def clear(self, location, card):
+        self._column_in[location] &= ~(1 << card)
+        self._column_out[location] &= ~(1 << card)
+        self._row_in[card] &= ~(1 << (location + 1))
+        self._row_out[card] &= ~(1 << (location + 1))
+    def _mask(self, known_in, known_out, full, condition):
+        if type(condition) == int:
+            condition = (condition,)
+        mask = 0
+        for state in condition:
+            if state == 1:
+                mask |= known_in
+            elif state == -1:
+                mask |= known_out
+            else:
+                mask |= full & ~(known_in | known_out)
+        return mask
+    def column_mask(self, location, condition):
+        return self._mask(self._column_in[location], self._column_out[location], self._all_cards, condition)
+    def row_mask(self, card, condition):
+        return self._mask(self._row_in[card], self._row_out[card], self._all_locations, condition)
+    def search_column(self, location, condition):
+        # condition int or tuple of ints
+        return list(_bits(self.column_mask(location, condition)))
+    def search_row(self, card, condition):
+        # condition int or tuple of ints
+        return [l - 1 for l in _bits(self.row_mask(card, condition))]
+    def count_column(self, location, condition, catagory = None):
+        mask = self.column_mask(location, condition)
+        if catagory != None:
+            mask &= self._catagory_masks.get(catagory, 0)
+        return mask.bit_count()
+    def count_row(self, card, condition):
+        return self.row_mask(card, condition).bit_count()
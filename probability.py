@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from itertools import combinations, product
+from math import comb
+
+class MarginalBudgetExceeded(Exception):
+    # Raised by MarginalCounter.marginals when counting would try more hands than its budget
+    pass
+
+class MarginalCounter:
+    """
+    A MarginalCounter finds, for each card, the probability that it is in each location,
+    by counting every deal consistent with a Tableau's grid and conditions, all deals being equally likely.
+    The count is split up by location:
+        - every way of filling the secret envelope is looped over
+        - once that is fixed, the remaining cards are dealt one player at a time and then to the
+          leftover cards, where the number of ways to deal the rest only depends on which cards are left
+    Cards that every player still to be dealt could have and that aren't in any condition are
+    interchangeable, so only how many of them are left matters, not which ones.
+    The count for the rest of the players is called a sub-count, and they are kept in a bounded
+    LRU cache keyed on those players' constraints and the cards left. Between turns most players'
+    constraints don't change, so sub-counts are reused from one turn to the next.
+    This is fast once the player's own hand is known, since every other player's hand is then chosen
+    from the few cards left. With nothing known about several hands the number of hands to try grows
+    too quickly, so marginals raises MarginalBudgetExceeded after trying work_budget hands in one call,
+    or never if work_budget is None. sampler.sample_until estimates the marginals in that case.
+    """
+    def __init__(self, num_players, card_to_catagory, cache_size = 4096, work_budget = 100000):
+        self._num_players = num_players
+        self._card_to_catagory = card_to_catagory
+        self._num_cards = len(card_to_catagory)
+        self._num_catagories = len(set(card_to_catagory))
+        self._num_cards_in_play = self._num_cards - self._num_catagories
+        self._hand_size = self._num_cards_in_play // num_players
+        self._num_leftover_cards = self._num_cards_in_play % num_players
+        self._cache_size = cache_size
+        self.work_budget = work_budget
+        self._work = 0
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    def stats(self):
+        return {"cache_hits": self.cache_hits, "cache_misses": self.cache_misses, "cache_entries": len(self._cache)}
+    def marginals(self, candidates, conditions):
+        # candidates[card] is the list of locations card could be in,
+        # conditions[player] is a list of tuples of cards, one of which must be in player's hand.
+        # Returns the number of consistent deals and a list, indexed by card, of dicts
+        # from location to the number of those deals with the card in that location.
+        # Raises MarginalBudgetExceeded if that takes more than work_budget hands, the sub-counts
+        # finished before then are kept in the cache.
+        self._work = 0
+        fixed = {c:locations[0] for c, locations in enumerate(candidates) if len(locations) == 1}
+        open_cards = [c for c in range(self._num_cards) if c not in fixed]
+        needed = {l:(self._num_leftover_cards if l == -1 else self._hand_size) for l in range(-1, self._num_players + 1)}
+        for c, l in fixed.items():
+            if l != 0:
+                needed[l] -= 1
+        # the leftover cards are dealt last like another player with no conditions
+        players = [p for p in list(range(1, self._num_players + 1)) + [-1] if needed[p] > 0]
+        for p in range(1, self._num_players + 1):
+            clauses = [clause for clause in conditions.get(p, []) if not any(fixed.get(c) == p for c in clause)]
+            if needed[p] == 0 and len(clauses) > 0:
+                return 0, [{} for _ in range(self._num_cards)]
+        # conditions restricted to cards that are still open, with satisfied ones removed
+        open_conditions = {p:tuple(sorted(tuple(sorted(c for c in clause if c not in fixed))
+                                          for clause in conditions.get(p, []) if p > 0
+                                          if not any(fixed.get(c) == p for c in clause)))
+                           for p in players}
+        in_conditions = set(c for p in players for clause in open_conditions[p] for c in clause)
+        plain = set(c for c in open_cards
+                    if c not in in_conditions and all(p in candidates[c] for p in players))
+        signature = tuple((p, needed[p], sum(1 << c for c in open_cards if p in candidates[c] and c not in plain),
+                           open_conditions[p]) for p in players)
+        # choices for the secret envelope, one card per catagory
+        secret_choices = []
+        for catagory in range(self._num_catagories):
+            known = [c for c, l in fixed.items() if l == 0 and self._card_to_catagory[c] == catagory]
+            if len(known) > 0:
+                secret_choices.append([None])
+            else:
+                secret_choices.append([c for c in open_cards
+                                       if self._card_to_catagory[c] == catagory and 0 in candidates[c]])
+        total = 0
+        counts = [{} for _ in range(self._num_cards)]
+        for secret in product(*secret_choices):
+            secret = [c for c in secret if c != None]
+            remaining = [c for c in open_cards if c not in secret]
+            interesting = sum(1 << c for c in remaining if c not in plain)
+            num_plain = len(remaining) - interesting.bit_count()
+            sub_total, sub_counts, plain_counts = self._count(signature, 0, interesting, num_plain)
+            if sub_total == 0:
+                continue
+            total += sub_total
+            for c in secret:
+                counts[c][0] = counts[c].get(0, 0) + sub_total
+            for c, by_player in sub_counts.items():
+                for p, n in by_player.items():
+                    counts[c][p] = counts[c].get(p, 0) + n
+            # every plain card is equally likely to be in each player's hand
+            for c in remaining:
+                if c in plain:
+                    for p, n in plain_counts.items():
+                        counts[c][p] = counts[c].get(p, 0) + n // num_plain
+        for c, l in fixed.items():
+            counts[c] = {l:total}
+        return total, counts
+    def _count(self, signature, i, interesting, num_plain):
+        # Number of ways to deal the interesting cards and num_plain plain cards to the players
+        # signature[i:], along with how many of those ways give each interesting card to each player,
+        # and the total number of plain cards each player gets over all of those ways
+        key = (signature[i:], interesting, num_plain)
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.cache_misses += 1
+        result = self._count_uncached(signature, i, interesting, num_plain)
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last = False)
+        return result
+    def _count_uncached(self, signature, i, interesting, num_plain):
+        if i == len(signature):
+            return (1 if interesting == 0 and num_plain == 0 else 0), {}, {}
+        reachable = 0
+        for _, _, candidate_mask, _ in signature[i:]:
+            reachable |= candidate_mask
+        if interesting & ~reachable:
+            return 0, {}, {}
+        p, needed, candidate_mask, clauses = signature[i]
+        options = [c for c in range(self._num_cards) if (interesting & candidate_mask) >> c & 1]
+        total = 0
+        counts = {}
+        plain_counts = {}
+        for size in range(max(0, needed - num_plain), min(needed, len(options)) + 1):
+            for hand in combinations(options, size):
+                self._work += 1
+                if self.work_budget != None and self._work > self.work_budget:
+                    raise MarginalBudgetExceeded(f"Counting deals tried more than {self.work_budget} hands, "
+                                                 "use sampler.sample_until to estimate the marginals")
+                if not all(any(c in hand for c in clause) for clause in clauses):
+                    continue
+                hand_mask = sum(1 << c for c in hand)
+                num_plain_taken = needed - size
+                sub_total, sub_counts, sub_plain_counts = self._count(signature, i + 1, interesting & ~hand_mask,
+                                                                      num_plain - num_plain_taken)
+                if sub_total == 0:
+                    continue
+                ways = comb(num_plain, num_plain_taken)
+                total += ways * sub_total
+                for c in hand:
+                    counts.setdefault(c, {})
+                    counts[c][p] = counts[c].get(p, 0) + ways * sub_total
+                for c, by_player in sub_counts.items():
+                    counts.setdefault(c, {})
+                    for q, n in by_player.items():
+                        counts[c][q] = counts[c].get(q, 0) + ways * n
+                if num_plain_taken > 0:
+                    plain_counts[p] = plain_counts.get(p, 0) + ways * sub_total * num_plain_taken
+                for q, n in sub_plain_counts.items():
+                    plain_counts[q] = plain_counts.get(q, 0) + ways * n
+        return total, counts, plain_counts
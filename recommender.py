@@ -0,0 +1,118 @@
+import copy
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from sampler import sample_deals
+
+# The recommender scores every suggestion of one card from each catagory by the number of grid points
+# it is expected to resolve. Outcomes of a suggestion, who passes and who shows which card, are
+# weighed by how often they happen over deals sampled from the Tableau. Each distinct outcome is
+# tried on the Tableau between push_checkpoint and rollback, and the result is cached by the facts
+# that outcome gives, so suggestions sharing cards and responses don't repeat the same update.
+
+# Per process state, set once per recommend call in each worker by _init_worker
+_tableau = None
+_deals = None
+_cache = {}
+_cache_key = None
+
+def suggestion_outcomes(deals, suggester, cards, num_players):
+    # Returns a dict from outcome to probability, an outcome being (players who passed, player who showed, card shown)
+    # with (players, None, None) when nobody showed. The suggester sees the card shown. A responder holding
+    # more than one of the cards is taken to show each of them with equal probability.
+    outcomes = {}
+    weight = 1 / len(deals)
+    for deal in deals:
+        passed = []
+        outcome = None
+        for i in range(1, num_players):
+            responder = (suggester - 1 + i) % num_players + 1
+            held = [c for c in cards if deal[c] == responder]
+            if len(held) > 0:
+                for card in held:
+                    outcome = (tuple(passed), responder, card)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + weight / len(held)
+                break
+            passed.append(responder)
+        if outcome == None:
+            outcome = (tuple(passed), None, None)
+            outcomes[outcome] = outcomes.get(outcome, 0) + weight
+    return outcomes
+
+def _resolved(tableau, suggester, cards, outcome):
+    # Number of grid points resolved when outcome is added to tableau and update is run
+    passed, shown_by, shown = outcome
+    facts = frozenset([(p, c, -1) for p in passed for c in cards] +
+                      ([(shown_by, shown, 1)] if shown_by != None else []))
+    if facts in _cache:
+        return _cache[facts]
+    before = tableau.num_unknown_entries()
+    tableau.push_checkpoint()
+    try:
+        tableau.add_suggestion(suggester, cards, passed, shown_by, shown)
+        tableau.update()
+        resolved = before - tableau.num_unknown_entries()
+    except AssertionError:
+        # the outcome contradicts the Tableau, which only happens if the sampled deals do
+        resolved = 0
+    tableau.rollback()
+    _cache[facts] = resolved
+    return resolved
+
+def _init_worker(tableau_bytes, deals, key):
+    global _tableau, _deals, _cache, _cache_key
+    _tableau = pickle.loads(tableau_bytes)
+    _deals = deals
+    if key != _cache_key:
+        _cache = {}
+        _cache_key = key
+
+def _score_batch(suggester, batch):
+    # Returns (expected grid points resolved, suggestion) for each suggestion in batch
+    scores = []
+    for cards in batch:
+        outcomes = suggestion_outcomes(_deals, suggester, cards, _tableau._num_players)
+        expected = sum(probability * _resolved(_tableau, suggester, cards, outcome) for outcome, probability in outcomes.items())
+        scores.append((expected, cards))
+    return scores
+
+def legal_suggestions(card_to_catagory):
+    # Every suggestion of one card from each catagory
+    by_catagory = {}
+    for c, catagory in enumerate(card_to_catagory):
+        by_catagory.setdefault(catagory, []).append(c)
+    return [cards for cards in product(*[by_catagory[catagory] for catagory in sorted(by_catagory)])]
+
+def recommend(tableau, suggester, top_k = 5, num_workers = None, num_deals = 200, seed = 0,
+              batch_size = 27, node_budget = 0, num_chains = 4):
+    """
+    Returns the top_k suggestions for suggester as a list of (expected grid points resolved, cards),
+    best first. The Tableau should already be updated, and is not changed.
+    Suggestions are scored in batches of batch_size across num_workers processes, where every
+    worker gets its own copy of the Tableau and of the num_deals sampled deals, which are pooled
+    from num_chains independently started chains, see sampler.sample_deals.
+    node_budget is the deal search budget used in each hypothetical update, 0 turns it off
+    so that only the basic rules are run.
+    """
+    deals = sample_deals(tableau, num_deals, seed, num_chains = num_chains)
+    work = copy.deepcopy(tableau)
+    work.set_collective_budget(node_budget)
+    tableau_bytes = pickle.dumps(work)
+    key = hashlib.sha1(tableau_bytes + pickle.dumps(deals)).hexdigest()
+    suggestions = legal_suggestions(tableau._card_to_catagory)
+    batches = [suggestions[i:i + batch_size] for i in range(0, len(suggestions), batch_size)]
+    num_workers = num_workers or os.cpu_count() or 1
+    scores = []
+    if num_workers == 1:
+        _init_worker(tableau_bytes, deals, key)
+        for batch in batches:
+            scores.extend(_score_batch(suggester, batch))
+    else:
+        with ProcessPoolExecutor(max_workers = num_workers, initializer = _init_worker,
+                                 initargs = (tableau_bytes, deals, key)) as executor:
+            for batch_scores in executor.map(_score_batch, [suggester] * len(batches), batches):
+                scores.extend(batch_scores)
+    scores.sort(key = lambda score: -score[0])
+    return scores[:top_k]
@@ -0,0 +1,131 @@
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from tableau import Tableau
+from tracker import card_to_catagory as clue_card_to_catagory
+from utils import check_setup, check_player, check_cards, check_suggestion
+
+# Replays recorded games without any prompts. Game logs are JSON Lines, one game per line:
+#     {"id": "game-1", "num_players": 4, "player": 2, "hand": [0, 7, 15, 20],
+#      "leftover": [3, 11],
+#      "suggestions": [{"suggester": 1, "cards": [2, 8, 14], "passed": [2], "shown_by": 3},
+#                      {"suggester": 2, "cards": [0, 9, 13], "passed": [], "shown_by": 3, "shown": 9}]}
+# Only num_players is required. player and hand give whose point of view the log is from,
+# card_to_catagory can be given for a different deck, and shown is only known to the suggester.
+# For each game a JSON line is written with what was deduced, or the error if the log is contradictory
+# or malformed.
+
+def replay_game(game, collective_node_budget = 20000) -> dict:
+    card_to_catagory = game.get("card_to_catagory", clue_card_to_catagory)
+    num_players = game["num_players"]
+    check_setup(num_players, card_to_catagory)
+    hand = check_cards(game.get("hand", []), len(card_to_catagory))
+    if len(hand) > 0:
+        check_player(game["player"], num_players)
+    leftover = check_cards(game.get("leftover", []), len(card_to_catagory))
+    suggestions = game.get("suggestions", [])
+    assert type(suggestions) == list, "suggestions must be a list"
+    for suggestion in suggestions:
+        check_suggestion(card_to_catagory, num_players, suggestion["suggester"], suggestion["cards"],
+                         suggestion.get("passed", []), suggestion.get("shown_by"), suggestion.get("shown"))
+    tableau = Tableau(num_players, card_to_catagory, bitset = True, collective_node_budget = collective_node_budget)
+    for card in hand:
+        tableau.add_entry_to_grid(game["player"], card, 1)
+    for card in leftover:
+        tableau.add_entry_to_grid(-1, card, 1)
+    for suggestion in suggestions:
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion.get("passed", []),
+                               suggestion.get("shown_by"), suggestion.get("shown"))
+    tableau.update()
+    locations = range(-1, num_players + 1)
+    known = {}
+    for c in range(len(card_to_catagory)):
+        found = [l for l in locations if tableau.check_grid(l, c) == 1]
+        if len(found) > 0:
+            known[c] = found[0]
+    return {"id": game.get("id"),
+            "solution": sorted(c for c, l in known.items() if l == 0),
+            "solved": all(tableau.check_grid(0, c) != 0 for c in range(len(card_to_catagory))),
+            "known": {str(c):l for c, l in known.items()},
+            "ruled_out": {str(c):[l for l in locations if tableau.check_grid(l, c) == -1]
+                          for c in range(len(card_to_catagory))}}
+
+def replay_line(line, collective_node_budget = 20000):
+    # Returns the output line for one line of a game log, or None for a blank line
+    line = line.strip()
+    if len(line) == 0:
+        return None
+    game = None
+    try:
+        game = json.loads(line)
+        assert type(game) == dict, "Game log line is not a JSON object"
+        result = replay_game(game, collective_node_budget)
+    except KeyError as error:
+        result = {"id": game.get("id") if type(game) == dict else None, "error": f"Missing or invalid key {error}"}
+    except (AssertionError, ValueError, IndexError, TypeError) as error:
+        # contradictory or malformed logs are reported in place of the game, so one bad line doesn't stop the rest
+        result = {"id": game.get("id") if type(game) == dict else None, "error": str(error)}
+    return json.dumps(result)
+
+def _replay_lines(lines, collective_node_budget):
+    # Worker side of the process pool, replays a chunk of lines
+    return [replay_line(line, collective_node_budget) for line in lines]
+
+def _chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def _replay_parallel(lines, jobs, chunk_size, collective_node_budget):
+    # Yields the output lines of chunks replayed by worker processes, in input order.
+    # Only a few chunks per worker are in flight at once, so input is read as a stream.
+    with ProcessPoolExecutor(max_workers = jobs) as executor:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_size):
+            pending.append(executor.submit(_replay_lines, chunk, collective_node_budget))
+            while len(pending) > 2 * jobs or (len(pending) > 0 and pending[0].done()):
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
+
+def replay(lines, out, jobs = 1, chunk_size = 64, collective_node_budget = 20000):
+    # Replays every game in lines, writing one JSON line per game to out as each finishes.
+    # With more than one job, chunks of games are spread across that many worker processes.
+    # Returns the number of games replayed.
+    if jobs <= 1:
+        results = (replay_line(line, collective_node_budget) for line in lines)
+    else:
+        results = _replay_parallel(lines, jobs, chunk_size, collective_node_budget)
+    games = 0
+    for result in results:
+        if result != None:
+            out.write(result + "\n")
+            games += 1
+    out.flush()
+    return games
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Replay Clue game logs in JSON Lines format")
+    parser.add_argument("logs", nargs = "*", help = "game log files, standard input is read if none or - is given")
+    parser.add_argument("-j", "--jobs", type = int, default = 1, help = "number of worker processes")
+    parser.add_argument("--chunk-size", type = int, default = 64, help = "games sent to a worker at a time")
+    parser.add_argument("--node-budget", type = int, default = 20000,
+                        help = "node budget of the deal search for each update, 0 turns it off")
+    args = parser.parse_args(argv)
+    files = [sys.stdin if path == "-" else open(path) for path in (args.logs or ["-"])]
+    start = time.perf_counter()
+    games = replay(chain.from_iterable(files), sys.stdout, args.jobs, args.chunk_size, args.node_budget)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {games} games in {elapsed:.2f}s ({games / elapsed if elapsed > 0 else 0:.1f} games/sec)", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from math import sqrt
+from assignment import Assignment
+from solver import DealSearch
+
+class SampleEstimate:
+    """
+    A SampleEstimate holds how often each card was found in each location over a number of sampled deals.
+    counts is a list, indexed by card, of dicts from location to the number of deals with the card there.
+    Confidence intervals are Wilson score intervals, which treat the samples as independent.
+    The samples come from Markov chains thinned out so that this is close to true, but the
+    intervals should still be read as approximate.
+    """
+    def __init__(self, samples, counts):
+        self.samples = samples
+        self.counts = counts
+    def probability(self, card, location):
+        return self.counts[card].get(location, 0) / self.samples
+    def interval(self, card, location, z = 1.96):
+        # Returns the (low, high) confidence interval for the probability card is in location
+        n = self.samples
+        p = self.probability(card, location)
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half_width = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, centre - half_width), min(1.0, centre + half_width)
+    def max_half_width(self, z = 1.96):
+        # Half the width of the widest interval over every card and location
+        widest = 0
+        for card, by_location in enumerate(self.counts):
+            for location in by_location:
+                low, high = self.interval(card, location, z)
+                widest = max(widest, (high - low) / 2)
+        return widest
+    def marginals(self):
+        return [{l:n / self.samples for l, n in by_location.items()} for by_location in self.counts]
+
+# The chains walk over every deal that fits the grid, the conditions included or not, with a deal
+# breaking n conditions weighted by VIOLATION_WEIGHT ** n, and only deals meeting every condition are
+# sampled. Without the detour through deals breaking conditions, two deals could be cut off from each
+# other by conditions that every deal in between breaks.
+VIOLATION_WEIGHT = 0.25
+
+def _violations(deal, players, conditions):
+    # Number of conditions of the given players not met by deal
+    return sum(1 for p in players for clause in conditions.get(p, []) if not any(deal[c] == p for c in clause))
+
+def _start_chain(setup, rng, deal = None):
+    # Returns deal, finding a random deal first if none is given, and the cards that can move
+    num_players, card_to_catagory, candidates, conditions = setup
+    if deal == None:
+        deal = DealSearch(num_players, card_to_catagory).find_deal(candidates, conditions, rng)
+        assert deal != None, "No deal is consistent with the information given"
+    assignment = Assignment(num_players, card_to_catagory)
+    for card, location in enumerate(deal):
+        assert assignment.try_assign(card, location), "Sampler given an invalid deal"
+    open_cards = [c for c in range(len(card_to_catagory)) if len(candidates[c]) > 1]
+    return deal, open_cards
+
+def _cycle(setup, deal, open_cards, rng):
+    # Proposes a cycle of cards, each taking the place of the next and the last taking the place of the
+    # first, or returns None. Starting from a random card, each card moves to a random other location it
+    # can be in and displaces a random card there, one of the same catagory in the secret envelope,
+    # until a card moves into the first card's place. The locations of a cycle are all different,
+    # with the secret envelope counting as one location per catagory.
+    _, card_to_catagory, candidates, _ = setup
+    def place(location, card):
+        return (0, card_to_catagory[card]) if location == 0 else location
+    first = rng.choice(open_cards)
+    start = place(deal[first], first)
+    visited = {start}
+    cycle = [first]
+    card = first
+    while True:
+        location = rng.choice([l for l in candidates[card] if l != deal[card]])
+        if place(location, card) == start:
+            return cycle
+        if place(location, card) in visited:
+            return None
+        visited.add(place(location, card))
+        displaced = [c for c in open_cards if deal[c] == location and place(location, c) == place(location, card)]
+        if len(displaced) == 0:
+            return None
+        card = rng.choice(displaced)
+        cycle.append(card)
+
+def _step(setup, deal, open_cards, rng):
+    # One Metropolis step, moving the cards of a proposed cycle and keeping the move with probability
+    # VIOLATION_WEIGHT ** (conditions broken after - conditions broken before), if that is less than 1.
+    # The chance of proposing a cycle is the same as that of proposing the cycle that undoes it, since
+    # each card has as many other locations to go to and each location as many cards to displace either
+    # way, so the chain is balanced. Any deal fitting the grid can be reached from any other by cycles,
+    # so every deal meeting the conditions is eventually sampled in proportion to how many there are.
+    # Half of all steps stay put, otherwise a chain between two deals would alternate and every
+    # sample an even number of steps apart would be the same deal.
+    _, _, _, conditions = setup
+    if len(open_cards) < 2 or rng.random() < 0.5:
+        return
+    cycle = _cycle(setup, deal, open_cards, rng)
+    if cycle == None:
+        return
+    locations = [deal[c] for c in cycle]
+    players = set(l for l in locations if l > 0)
+    before = _violations(deal, players, conditions)
+    for i, card in enumerate(cycle):
+        deal[card] = locations[(i + 1) % len(cycle)]
+    after = _violations(deal, players, conditions)
+    if after > before and rng.random() >= VIOLATION_WEIGHT ** (after - before):
+        for card, location in zip(cycle, locations):
+            deal[card] = location
+
+def _sample(setup, deal, open_cards, rng, thin):
+    # Steps the chain thin times, and again every thin steps until the deal meets every condition
+    num_players, _, _, conditions = setup
+    while True:
+        for _ in range(thin):
+            _step(setup, deal, open_cards, rng)
+        if _violations(deal, range(1, num_players + 1), conditions) == 0:
+            return
+
+def _run_chain(setup, seed, deal, state, num_samples, thin, burn_in):
+    # Runs one Markov chain over deals and returns the location counts of num_samples samples taken
+    # every thin steps, along with the final deal and random state so the chain can be continued.
+    # A new chain (deal is None) starts from a random deal found by DealSearch and is burnt in first.
+    rng = random.Random(seed)
+    if state != None:
+        rng.setstate(state)
+    deal, open_cards = _start_chain(setup, rng, deal)
+    if state == None:
+        for _ in range(burn_in):
+            _step(setup, deal, open_cards, rng)
+    counts = [{} for _ in range(len(deal))]
+    for _ in range(num_samples):
+        _sample(setup, deal, open_cards, rng, thin)
+        for card, location in enumerate(deal):
+            counts[card][location] = counts[card].get(location, 0) + 1
+    return counts, deal, rng.getstate()
+
+def sampling_setup(tableau):
+    # What a chain needs to know about a Tableau, in a form that can be sent to worker processes
+    return (tableau._num_players, tableau._card_to_catagory, tableau.candidates(), tableau.open_conditions())
+
+def sample_deals(tableau, num_deals, seed = 0, thin = 50, burn_in = 2000, num_chains = 4):
+    # Returns num_deals deals consistent with a Tableau, sampled in this process from num_chains chains
+    # that each start from their own random deal, so a chain slow to leave its start doesn't decide every deal.
+    # Each deal is a list giving the location of each card.
+    setup = sampling_setup(tableau)
+    deals = []
+    for chain in range(num_chains):
+        rng = random.Random(seed * 1000003 + chain)
+        deal, open_cards = _start_chain(setup, rng)
+        for _ in range(burn_in):
+            _step(setup, deal, open_cards, rng)
+        for _ in range(num_deals * (chain + 1) // num_chains - num_deals * chain // num_chains):
+            _sample(setup, deal, open_cards, rng, thin)
+            deals.append(list(deal))
+    return deals
+
+def sample_marginals(tableau, num_workers = None, batch_size = 200, max_samples = None,
+                     seed = 0, thin = 50, burn_in = 2000):
+    """
+    Samples deals consistent with a Tableau's grid and conditions, for when counting every deal
+    exactly with Tableau.marginals is too slow. Every sample is an Assignment that also satisfies
+    every condition, so no invalid deal is ever counted.
+    One Markov chain is run per worker of a ProcessPoolExecutor, each with its own random
+    generator seeded from seed and the worker number. Every time a worker finishes a batch
+    of batch_size samples, a SampleEstimate of everything sampled so far is yielded, so the
+    caller can stop as soon as the intervals are tight enough. Sampling stops by itself once
+    max_samples samples have been taken, if it is given.
+    """
+    setup = sampling_setup(tableau)
+    num_cards = len(setup[1])
+    counts = [{} for _ in range(num_cards)]
+    samples = 0
+    submitted = 0
+    num_workers = num_workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers = num_workers)
+    try:
+        running = set()
+        for worker in range(num_workers):
+            if max_samples != None and submitted >= max_samples:
+                break
+            running.add(executor.submit(_run_chain, setup, seed * 1000003 + worker, None, None,
+                                        batch_size, thin, burn_in))
+            submitted += batch_size
+        while running:
+            done, running = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                batch_counts, deal, state = future.result()
+                for card, by_location in enumerate(batch_counts):
+                    for location, n in by_location.items():
+                        counts[card][location] = counts[card].get(location, 0) + n
+                samples += batch_size
+                if max_samples == None or submitted < max_samples:
+                    running.add(executor.submit(_run_chain, setup, None, deal, state, batch_size, thin, burn_in))
+                    submitted += batch_size
+                yield SampleEstimate(samples, [dict(by_location) for by_location in counts])
+    finally:
+        executor.shutdown(wait = False, cancel_futures = True)
+
+def sample_until(tableau, tolerance = 0.02, max_samples = 100000, **kwargs):
+    # Samples until every confidence interval is within tolerance of its estimate, or max_samples is hit
+    estimate = None
+    for estimate in sample_marginals(tableau, max_samples = max_samples, **kwargs):
+        if estimate.max_half_width() <= tolerance:
+            break
+    return estimate
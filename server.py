@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from tableau import Tableau
+from tracker import card_to_catagory as clue_card_to_catagory
+from utils import check_setup, check_player, check_cards, check_suggestion
+
+# Hosts many games in one process over a TCP or Unix socket. Each line sent is one JSON command,
+# and each command gets one JSON line back with the same "id", "ok" true and the result, or
+# "ok" false and an "error". The commands are:
+#     {"command": "create_game", "num_players": 4, "player": 2, "hand": [0, 7, 15, 20], "leftover": [3, 11]}
+#         only num_players is required, card_to_catagory can be given for a different deck,
+#         and "game" picks the game id instead of one being made up. Returns {"game": id}
+#     {"command": "add_fact", "game": id, "location": 3, "card": 9, "state": 1}
+#     {"command": "add_suggestion", "game": id, "suggester": 1, "cards": [2, 8, 14], "passed": [2], "shown_by": 3}
+#         shown can also be given when it is known, as in tracker.py
+#     {"command": "query_grid", "game": id}
+#         returns the grid as {"grid": {location: [state of each card]}, "solution", "solved", "unknown"}
+#     {"command": "stats", "game": id}
+#         returns the latency of the game's commands, or of every game if no game is given
+#     {"command": "close_game", "game": id}
+# Every change runs update on a bounded thread pool, so the server keeps answering other games
+# while one game deduces. Commands for the same game run one at a time in the order they arrive.
+# Games with no commands for idle_timeout seconds are closed.
+
+class Session:
+    """
+    A Session is one game hosted by the server, its Tableau and the latency of its commands.
+    error is set once the game is given contradictory information, after which the Tableau
+    may be partially updated, so only query_grid, stats and close_game are allowed.
+    """
+    def __init__(self, game_id, tableau, latency_window = 1000):
+        self.game_id = game_id
+        self.tableau = tableau
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.error = None
+        self.commands = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        # latency of the most recent commands, for percentiles
+        self.latencies = deque(maxlen = latency_window)
+    def record(self, latency):
+        self.commands += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.latencies.append(latency)
+    def latency_stats(self):
+        # Latency of this session's commands in milliseconds
+        recent = sorted(self.latencies)
+        def percentile(q):
+            return 1000 * recent[min(len(recent) - 1, int(q * len(recent)))] if len(recent) > 0 else 0.0
+        return {"commands": self.commands,
+                "mean_ms": 1000 * self.total_latency / self.commands if self.commands > 0 else 0.0,
+                "p50_ms": percentile(0.5),
+                "p99_ms": percentile(0.99),
+                "max_ms": 1000 * self.max_latency}
+
+def _grid_summary(tableau):
+    num_cards = tableau._num_cards
+    return {"grid": {str(l):[tableau.check_grid(l, c) for c in range(num_cards)]
+                     for l in range(-1, tableau._num_players + 1)},
+            "solution": tableau.search_column(0, 1),
+            "solved": all(tableau.check_grid(0, c) != 0 for c in range(num_cards)),
+            "unknown": tableau.num_unknown_entries()}
+
+class TrackerServer:
+    """
+    A TrackerServer holds the sessions and answers commands, see the top of server.py.
+    update and other deduction runs on a pool of max_workers threads.
+    collective_node_budget bounds the deal search of each update, so a hard game gives up on
+    collective deductions instead of holding a worker for long.
+    """
+    def __init__(self, max_workers = 4, idle_timeout = 3600, collective_node_budget = 20000):
+        self.sessions = {}
+        self.idle_timeout = idle_timeout
+        self.collective_node_budget = collective_node_budget
+        self._executor = ThreadPoolExecutor(max_workers = max_workers)
+        self._game_ids = count(1)
+        self._commands = {"create_game": self._create_game,
+                          "add_fact": self._add_fact,
+                          "add_suggestion": self._add_suggestion,
+                          "query_grid": self._query_grid,
+                          "stats": self._stats,
+                          "close_game": self._close_game}
+    async def handle(self, request) -> dict:
+        # Answers one command, never raises
+        reply = {"id": request.get("id")} if type(request) == dict else {"id": None}
+        start = time.perf_counter()
+        session = None
+        try:
+            assert type(request) == dict, "Command must be a JSON object"
+            command = self._commands.get(request.get("command"))
+            assert command != None, f"Unknown command {request.get('command')}"
+            if request.get("command") == "create_game":
+                session = await command(request)
+                reply.update({"ok": True, "game": session.game_id})
+            else:
+                session = self.sessions.get(request.get("game"))
+                if request.get("command") == "stats" and "game" not in request:
+                    reply.update({"ok": True, "games": {game_id:s.latency_stats() for game_id, s in self.sessions.items()}})
+                else:
+                    assert session != None, f"No game {request.get('game')}"
+                    async with session.lock:
+                        session.last_used = time.monotonic()
+                        reply.update({"ok": True}, **await command(session, request))
+        except KeyError as error:
+            reply.update({"ok": False, "error": f"Missing {error}"})
+        except (AssertionError, TypeError, ValueError, IndexError) as error:
+            reply.update({"ok": False, "error": str(error)})
+        if session != None:
+            session.record(time.perf_counter() - start)
+        return reply
+    async def _run(self, session, work):
+        # Runs work on the thread pool, marking the session contradictory if it fails an assertion.
+        # work must only be given checked input, so that an assertion means the game is contradictory.
+        assert session.error == None, f"Game {session.game_id} was given contradictory information: {session.error}"
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, work)
+        except AssertionError as error:
+            session.error = str(error)
+            raise
+    async def _create_game(self, request):
+        # Every field of a command is checked before the game is touched, so that bad input is an error for that
+        # command alone and not mistaken for contradictory information, which would stop the game taking any more
+        game_id = str(request.get("game") or f"game-{next(self._game_ids)}")
+        assert game_id not in self.sessions, f"Game {game_id} already exists"
+        card_to_catagory = request.get("card_to_catagory", clue_card_to_catagory)
+        num_players = request["num_players"]
+        check_setup(num_players, card_to_catagory)
+        hand = check_cards(request.get("hand", []), len(card_to_catagory))
+        leftover = check_cards(request.get("leftover", []), len(card_to_catagory))
+        if len(hand) > 0:
+            check_player(request["player"], num_players)
+        tableau = Tableau(num_players, card_to_catagory, bitset = True, collective_node_budget = self.collective_node_budget)
+        session = Session(game_id, tableau)
+        def work():
+            for card in hand:
+                tableau.add_entry_to_grid(request["player"], card, 1)
+            for card in leftover:
+                tableau.add_entry_to_grid(-1, card, 1)
+            tableau.update()
+        await self._run(session, work)
+        self.sessions[game_id] = session
+        return session
+    async def _add_fact(self, session, request):
+        tableau = session.tableau
+        location, card, state = request["location"], request["card"], request["state"]
+        assert type(location) == int and -1 <= location <= tableau._num_players, f"No location {location}"
+        check_cards([card], tableau._num_cards)
+        assert state in (-1, 1) and type(state) == int, f"Invalid state {state}, must be 1 or -1"
+        def work():
+            tableau.add_entry_to_grid(location, card, state)
+            tableau.update()
+        await self._run(session, work)
+        return {}
+    async def _add_suggestion(self, session, request):
+        tableau = session.tableau
+        suggester, cards, passed = request["suggester"], request["cards"], request.get("passed", [])
+        shown_by, shown = request.get("shown_by"), request.get("shown")
+        check_suggestion(tableau._card_to_catagory, tableau._num_players, suggester, cards, passed, shown_by, shown)
+        def work():
+            tableau.add_suggestion(suggester, cards, passed, shown_by, shown)
+            tableau.update()
+        await self._run(session, work)
+        return {}
+    async def _query_grid(self, session, request):
+        summary = _grid_summary(session.tableau)
+        summary["error"] = session.error
+        return summary
+    async def _stats(self, session, request):
+        return {"latency": session.latency_stats()}
+    async def _close_game(self, session, request):
+        self.sessions.pop(session.game_id, None)
+        return {}
+    def evict_idle(self):
+        # Closes every session idle for longer than idle_timeout, returns their game ids
+        now = time.monotonic()
+        idle = [game_id for game_id, session in self.sessions.items()
+                if now - session.last_used > self.idle_timeout and not session.lock.locked()]
+        for game_id in idle:
+            del self.sessions[game_id]
+        return idle
+    async def evict_forever(self, interval = 60):
+        while True:
+            await asyncio.sleep(interval)
+            for game_id in self.evict_idle():
+                print(f"Closed idle game {game_id}", file = sys.stderr)
+    async def handle_connection(self, reader, writer):
+        # Answers each line from a client in order, until the client disconnects
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                if len(line.strip()) == 0:
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    reply = {"id": None, "ok": False, "error": f"Invalid JSON: {error}"}
+                else:
+                    reply = await self.handle(request)
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    def close(self):
+        self._executor.shutdown(wait = False, cancel_futures = True)
+
+async def serve(server, host = "127.0.0.1", port = 8765, unix_path = None, evict_interval = 60):
+    if unix_path != None:
+        listener = await asyncio.start_unix_server(server.handle_connection, path = unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+    sockets = ", ".join(str(s.getsockname()) for s in listener.sockets)
+    print(f"Serving on {sockets}", file = sys.stderr)
+    evictor = asyncio.create_task(server.evict_forever(evict_interval))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        evictor.cancel()
+        server.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Serve many Clue games over line-delimited JSON")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--unix", help = "listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type = int, default = 4, help = "threads running update")
+    parser.add_argument("--idle-timeout", type = float, default = 3600, help = "seconds before an idle game is closed")
+    parser.add_argument("--node-budget", type = int, default = 20000,
+                        help = "node budget of the deal search for each update, 0 turns it off")
+    args = parser.parse_args(argv)
+    server = TrackerServer(args.workers, args.idle_timeout, args.node_budget)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix, min(60, args.idle_timeout)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
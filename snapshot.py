@@ -0,0 +1,201 @@
+import mmap
+import os
+import struct
+from grid import BitsetGrid
+from tableau import Tableau
+
+# A snapshot is the state of a Tableau in about a hundred bytes for a standard game, laid out as:
+#     header, HEADER below: magic b"CLTS", format version, flags, number of players,
+#         number of catagories and number of cards
+#     card_to_catagory, one byte per card
+#     grid, 2 bits per point, column by column from -1 with 4 points per byte, lowest bits first,
+#         using 0 for unknown, 1 for known in and 2 for known out
+#     solved flags, one bit per column from -1 and then one bit per row, lowest bits first
+#     conditions, for each player a varint count of conditions, then each condition as a varint
+#         number of cards followed by a varint for each card
+# The Assignment is not stored since it is the cards known in each location, and the rules
+# update runs are not stored since every rule is queued again when a snapshot is loaded.
+# Condition cards ruled out of the player's hand are kept, and unit conditions found but not
+# yet used by _satisfy_player are stored as conditions of one card.
+#
+# An archive is a file of snapshots that is only ever appended to, laid out as:
+#     ARCHIVE_HEADER: magic b"CLTA" and format version
+#     records, each RECORD below: length of the game id and of the snapshot, then the game id
+#         in UTF-8 and the snapshot
+# Appending a game id again replaces its snapshot. Opening an archive maps the file with mmap and
+# reads only the record lengths and game ids, so loading one game doesn't parse any other.
+# A record cut short, such as by a crash while appending, is ignored along with anything after it.
+
+MAGIC = b"CLTS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBH")
+FLAG_BITSET = 1
+ARCHIVE_MAGIC = b"CLTA"
+ARCHIVE_HEADER = struct.Struct("<4sB")
+RECORD = struct.Struct("<HI")
+
+def _write_varint(out, value):
+    # Unsigned LEB128, 7 bits per byte with the high bit set on every byte but the last
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, offset):
+    # Returns (value, offset after the varint)
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def _pack_bits(values, bits):
+    # Packs small non-negative ints into bytes, bits each, lowest bits first
+    per_byte = 8 // bits
+    out = bytearray((len(values) + per_byte - 1) // per_byte)
+    for i, value in enumerate(values):
+        out[i // per_byte] |= value << (bits * (i % per_byte))
+    return out
+
+def _unpack_bits(data, offset, count, bits):
+    # Returns (values, offset after them)
+    per_byte = 8 // bits
+    mask = (1 << bits) - 1
+    values = [(data[offset + i // per_byte] >> (bits * (i % per_byte))) & mask for i in range(count)]
+    return values, offset + (count + per_byte - 1) // per_byte
+
+_STATE_TO_CODE = {0: 0, 1: 1, -1: 2}
+_CODE_TO_STATE = (0, 1, -1)
+
+def dumps(tableau) -> bytes:
+    # Returns the snapshot of tableau
+    num_players = tableau._num_players
+    num_cards = tableau._num_cards
+    locations = range(-1, num_players + 1)
+    flags = FLAG_BITSET if isinstance(tableau._grid, BitsetGrid) else 0
+    out = bytearray(HEADER.pack(MAGIC, VERSION, flags, num_players, tableau._num_catagories, num_cards))
+    out += bytes(tableau._card_to_catagory)
+    out += _pack_bits([_STATE_TO_CODE[tableau.check_grid(l, c)] for l in locations for c in range(num_cards)], 2)
+    out += _pack_bits([int(tableau._column_states[l]) for l in locations] +
+                      [int(solved) for solved in tableau._row_states], 1)
+    for p in range(1, num_players + 1):
+        store = tableau._conditions[p]
+        clauses = store.clauses() + [(card,) for card in store._units]
+        _write_varint(out, len(clauses))
+        for clause in clauses:
+            _write_varint(out, len(clause))
+            for card in clause:
+                _write_varint(out, card)
+    return bytes(out)
+
+def loads(data, **kwargs) -> Tableau:
+    # Returns a new Tableau with the state in the snapshot data, which can be any bytes-like object.
+    # kwargs are passed on to Tableau, by default bitset is whatever the saved Tableau used.
+    magic, version, flags, num_players, num_catagories, num_cards = HEADER.unpack_from(data, 0)
+    assert magic == MAGIC, "Data is not a Tableau snapshot"
+    assert version == VERSION, f"Unsupported snapshot version {version}"
+    offset = HEADER.size
+    card_to_catagory = list(data[offset:offset + num_cards])
+    offset += num_cards
+    assert len(set(card_to_catagory)) == num_catagories, "Snapshot header does not match its catagories"
+    kwargs.setdefault("bitset", bool(flags & FLAG_BITSET))
+    tableau = Tableau(num_players, card_to_catagory, **kwargs)
+    locations = range(-1, num_players + 1)
+    codes, offset = _unpack_bits(data, offset, len(locations) * num_cards, 2)
+    for i, code in enumerate(codes):
+        l, c = divmod(i, num_cards)
+        l -= 1
+        if code != 0:
+            tableau._grid.set(l, c, _CODE_TO_STATE[code])
+            if code == 1:
+                assert tableau._assignment.try_assign(c, l), "Snapshot has an invalid assignment"
+    solved, offset = _unpack_bits(data, offset, len(locations) + num_cards, 1)
+    for l in locations:
+        tableau._column_states[l] = bool(solved[l + 1])
+    tableau._row_states = [bool(s) for s in solved[len(locations):]]
+    for p in range(1, num_players + 1):
+        num_clauses, offset = _read_varint(data, offset)
+        for _ in range(num_clauses):
+            length, offset = _read_varint(data, offset)
+            clause = []
+            for _ in range(length):
+                card, offset = _read_varint(data, offset)
+                clause.append(card)
+            tableau._conditions[p].add(clause, lambda c: tableau._grid.get(p, c))
+    return tableau
+
+class SnapshotArchive:
+    """
+    A SnapshotArchive is an append-only file of Tableau snapshots indexed by game id, see the top of snapshot.py.
+    The file is created if it doesn't exist. Snapshots are read straight from a memory map of the file,
+    and append writes to the end of the file and extends the index without reading the rest.
+    """
+    def __init__(self, path):
+        self._path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as f:
+                f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, VERSION))
+        self._file = open(path, "r+b")
+        self._map = None
+        # game id to (offset, length) of its latest snapshot
+        self._index = {}
+        self._end = ARCHIVE_HEADER.size
+        self._remap()
+        magic, version = ARCHIVE_HEADER.unpack_from(self._map, 0)
+        assert magic == ARCHIVE_MAGIC, f"{path} is not a snapshot archive"
+        assert version == VERSION, f"Unsupported archive version {version}"
+        self._scan()
+    def _remap(self):
+        if self._map != None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+    def _scan(self):
+        # Indexes records from self._end to the last complete record
+        size = len(self._map)
+        while self._end + RECORD.size <= size:
+            id_length, length = RECORD.unpack_from(self._map, self._end)
+            start = self._end + RECORD.size + id_length
+            if start + length > size:
+                break
+            game_id = self._map[self._end + RECORD.size:start].decode()
+            self._index[game_id] = (start, length)
+            self._end = start + length
+    def __len__(self):
+        return len(self._index)
+    def __contains__(self, game_id):
+        return game_id in self._index
+    def game_ids(self):
+        return list(self._index)
+    def snapshot(self, game_id) -> memoryview:
+        # The raw snapshot of a game, a view into the memory map that must be
+        # released before the archive is appended to or closed
+        offset, length = self._index[game_id]
+        return memoryview(self._map)[offset:offset + length]
+    def load(self, game_id, **kwargs) -> Tableau:
+        view = self.snapshot(game_id)
+        try:
+            return loads(view, **kwargs)
+        finally:
+            view.release()
+    def append(self, game_id, tableau):
+        # Saves tableau as the latest snapshot of game_id
+        encoded_id = game_id.encode()
+        data = dumps(tableau)
+        # anything after the last complete record is a record cut short, which is written over
+        self._file.seek(self._end)
+        self._file.write(RECORD.pack(len(encoded_id), len(data)) + encoded_id + data)
+        self._file.truncate()
+        self._file.flush()
+        self._remap()
+        self._scan()
+    def close(self):
+        self._map.close()
+        self._file.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,174 @@
+import time
+from assignment import Assignment
+
+class _BudgetExhausted(Exception):
+    pass
+
+class DealSearch:
+    """
+    A DealSearch finds which card locations are impossible by searching over full deals.
+    A deal is a complete Assignment of every card which also satisfies every condition.
+    The search is given, for each card, the locations that haven't been ruled out of its row,
+    and for each player the conditions that haven't been satisfied yet.
+    For every open card and location, it looks for a deal with the card in that location:
+        - if one is found, every card location in that deal is possible, so those don't need
+          to be searched for again
+        - if the search finishes without finding one, the card can't be in that location
+    Each search is a backtracking search that builds on Assignment's validity rules, assigns the
+    card with the fewest locations left first, and prunes any partial deal where a location can
+    no longer be filled or a condition can no longer be satisfied.
+    The search is bounded by a node budget and a time budget (in seconds), either can be None.
+    When the budget runs out only locations proven impossible so far are returned.
+    Each call gets a new budget by default, or with new_budget False it spends what is left of the
+    budget started by the last call to start_budget, so that several calls can share one budget.
+    """
+    def __init__(self, num_players, card_to_catagory, node_budget = None, time_budget = None):
+        self._num_players = num_players
+        self._card_to_catagory = card_to_catagory
+        self._num_cards = len(card_to_catagory)
+        self._num_catagories = len(set(card_to_catagory))
+        self._num_cards_in_play = self._num_cards - self._num_catagories
+        self._hand_size = self._num_cards_in_play // num_players
+        self._num_leftover_cards = self._num_cards_in_play % num_players
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        # counters over every call to impossible_entries
+        self.nodes_explored = 0
+        self.deals_found = 0
+        self.searches = 0
+        self.budget_exhausted = 0
+        self.start_budget()
+    def stats(self):
+        return {"nodes_explored": self.nodes_explored, "deals_found": self.deals_found,
+                "searches": self.searches, "budget_exhausted": self.budget_exhausted}
+    def start_budget(self):
+        # Starts a budget of node_budget nodes and time_budget seconds from now
+        self._nodes = 0
+        self._deadline = None if self.time_budget == None else time.perf_counter() + self.time_budget
+    def budget_left(self) -> bool:
+        return (self.node_budget == None or self._nodes < self.node_budget) and \
+               (self._deadline == None or time.perf_counter() <= self._deadline)
+    def _start(self, candidates, conditions, rng = None, new_budget = True):
+        # Assign every card with only one location left and return the rest
+        self._candidates = [list(locations) for locations in candidates]
+        self._conditions = conditions
+        self._rng = rng
+        self._assignment = Assignment(self._num_players, self._card_to_catagory)
+        if new_budget:
+            self.start_budget()
+        for card, locations in enumerate(self._candidates):
+            if len(locations) == 1:
+                assert self._assignment.try_assign(card, locations[0]), "DealSearch given an invalid assignment"
+        open_cards = [c for c in range(self._num_cards) if len(self._candidates[c]) > 1]
+        open_cards.sort(key = lambda c: len(self._candidates[c]))
+        return open_cards
+    def find_deal(self, candidates, conditions, rng = None, new_budget = True):
+        # Returns a list giving the location of each card in one deal, or None if there is no deal
+        # or the budget runs out. If rng (a random.Random) is given, locations are tried in a random order.
+        open_cards = self._start(candidates, conditions, rng, new_budget)
+        self.searches += 1
+        try:
+            if self._search(open_cards):
+                return self._deal
+        except _BudgetExhausted:
+            self.budget_exhausted += 1
+        return None
+    def impossible_entries(self, candidates, conditions, new_budget = True):
+        # candidates[card] is the list of locations card could be in,
+        # conditions[player] is a list of tuples of cards, one of which must be in player's hand.
+        # Returns a list of (location, card) pairs that are in no deal.
+        open_cards = self._start(candidates, conditions, new_budget = new_budget)
+        seen = [set(locations) if len(locations) == 1 else set() for locations in self._candidates]
+        impossible = []
+        try:
+            for card in open_cards:
+                for location in list(self._candidates[card]):
+                    if location in seen[card]:
+                        continue
+                    self.searches += 1
+                    found = False
+                    if self._assignment.try_assign(card, location):
+                        found = self._search([c for c in open_cards if c != card])
+                        self._assignment.deassign(card)
+                    if found:
+                        for c, l in enumerate(self._deal):
+                            seen[c].add(l)
+                    else:
+                        impossible.append((location, card))
+                        self._candidates[card].remove(location)
+        except _BudgetExhausted:
+            self.budget_exhausted += 1
+        return impossible
+    def _options(self, card):
+        # Locations card can be assigned to without breaking the Assignment's validity rules
+        options = []
+        for location in self._candidates[card]:
+            if self._assignment.try_assign(card, location):
+                self._assignment.deassign(card)
+                options.append(location)
+        return options
+    def _feasible(self, unassigned) -> bool:
+        # Checks that every location can still be filled and every condition can still be satisfied
+        room = {l:0 for l in range(-1, self._num_players + 1)}
+        secret_room = [0 for _ in range(self._num_catagories)]
+        for card in unassigned:
+            for location in self._candidates[card]:
+                room[location] += 1
+                if location == 0:
+                    secret_room[self._card_to_catagory[card]] += 1
+        if self._num_leftover_cards - self._assignment.num_with_assignment(-1) > room[-1]:
+            return False
+        for p in range(1, self._num_players + 1):
+            if self._hand_size - self._assignment.num_with_assignment(p) > room[p]:
+                return False
+        secret_catagories = set(self._card_to_catagory[c] for c in self._assignment.cards_with_assignment(0))
+        for catagory in range(self._num_catagories):
+            if catagory not in secret_catagories and secret_room[catagory] == 0:
+                return False
+        for p, clauses in self._conditions.items():
+            # conditions with no cards in common each need a different card from the rest of the hand
+            needed = 0
+            used = set()
+            for clause in clauses:
+                if any(self._assignment.assignment_of(c) == p for c in clause):
+                    continue
+                open_cards = [c for c in clause if self._assignment.assignment_of(c) == None and p in self._candidates[c]]
+                if len(open_cards) == 0:
+                    return False
+                if used.isdisjoint(open_cards):
+                    used.update(open_cards)
+                    needed += 1
+            if needed > self._hand_size - self._assignment.num_with_assignment(p):
+                return False
+        return True
+    def _search(self, unassigned) -> bool:
+        self._nodes += 1
+        self.nodes_explored += 1
+        if self.node_budget != None and self._nodes > self.node_budget:
+            raise _BudgetExhausted()
+        if self._deadline != None and self._nodes % 256 == 0 and time.perf_counter() > self._deadline:
+            raise _BudgetExhausted()
+        if not self._feasible(unassigned):
+            return False
+        if len(unassigned) == 0:
+            self._deal = [self._assignment.assignment_of(c) for c in range(self._num_cards)]
+            self.deals_found += 1
+            return True
+        # assign the most constrained card first
+        best_card, best_options = None, None
+        for card in unassigned:
+            options = self._options(card)
+            if best_options == None or len(options) < len(best_options):
+                best_card, best_options = card, options
+                if len(options) <= 1:
+                    break
+        remaining = [c for c in unassigned if c != best_card]
+        if self._rng != None:
+            self._rng.shuffle(best_options)
+        for location in best_options:
+            self._assignment.try_assign(best_card, location)
+            found = self._search(remaining)
+            self._assignment.deassign(best_card)
+            if found:
+                return True
+        return False
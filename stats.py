@@ -0,0 +1,37 @@
+import json
+
+class TableauStats:
+    """
+    TableauStats records where a Tableau spends its time deducing, when stats are turned on.
+    For each rule run by update, rules[name] has:
+        - calls, the number of times it was run
+        - facts, the number of new grid points it found
+        - seconds, the total wall time spent in it
+    updates has a record for each call to update, with how many rounds of draining the queue and
+    then running satisfy_collective it took, how many rules it ran from the queue, and its wall time.
+    entry_calls counts calls to add_entry_to_grid, and entries counts the ones that gave new information.
+    provenance maps each (location, card) point on the grid to the rule that found it,
+    or "input" if it was given to the Tableau directly.
+    """
+    def __init__(self):
+        self.rules = {}
+        self.updates = []
+        self.entry_calls = 0
+        self.entries = 0
+        self.provenance = {}
+    def record_rule(self, rule, facts, seconds):
+        stats = self.rules.setdefault(rule, {"calls": 0, "facts": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["facts"] += facts
+        stats["seconds"] += seconds
+    def record_update(self, rounds, rules_run, seconds):
+        self.updates.append({"rounds": rounds, "rules_run": rules_run, "seconds": seconds})
+    def to_dict(self):
+        return {"rules": self.rules,
+                "updates": self.updates,
+                "entry_calls": self.entry_calls,
+                "entries": self.entries,
+                "provenance": [{"location": location, "card": card, "rule": rule}
+                               for (location, card), rule in self.provenance.items()]}
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
@@ -1,8 +1,12 @@
 from assignment import Assignment
-from itertools import repeat, combinations
-
-def cards_satisfy_cond(cards, condition):
-    return any([c in cards for c in condition])
+from conditions import ConditionStore
+from grid import ListGrid, BitsetGrid
+from probability import MarginalCounter
+from solver import DealSearch
+from stats import TableauStats
+from collections import deque
+from itertools import repeat
+from time import perf_counter
 
 class Tableau:
     """
@@ -12,7 +16,7 @@ class Tableau:
         - Inside the secret envelope is 0
         - Inside a given player's hand is the corresponding player number
     Each "row" of the grid is a particular card in the game.
-    The grid is accessed as grid[col_num][row_num].
+    A point on the grid is read with check_grid(location, card), or _grid.get(location, card) inside the Tableau.
     Each point on the gird has a value:
         - If that card is known to be in that location, it is 1
         - If that card is known to not be in that location, it is -1
@@ -24,10 +28,26 @@ class Tableau:
         The given player has at least one of these in their hand
     This information is collected when a player shows a card to another player after a suggestion
     When checking if a given arrangement of cards is possible, the condition array is checked.
-    The array is accessed conditions[player_num][index].
+    The conditions of each player are kept in a ConditionStore, accessed as conditions[player_num],
+    which indexes them by card so that new grid entries only touch the conditions they affect.
     Not every player will have an equal number of conditions
+    The grid is stored as a dict of lists by default, or as per row and column bitmasks
+    when bitset is True, see grid.py. Both storage modes give the same results.
+    Deductions needing all players at once are found by searching over full deals, see solver.py.
+    That search is bounded by collective_node_budget and collective_time_budget (in seconds),
+    shared by every round of searching in one call to update, and a node budget of 0 turns it off.
+    The probability of each card being in each location is found by counting deals, see probability.py,
+    trying at most marginal_work_budget hands per call to marginals, or without limit if it is None.
+    For what-if questions, push_checkpoint saves the current state and rollback returns to it.
+    While a checkpoint is pushed every change to the grid, the solved flags, the conditions and
+    the Assignment is logged on a trail, so rollback only has to undo what changed since.
+    With stats True, or after enable_stats, update records the calls, new grid points and time of
+    each rule and which rule found each point on the grid, see stats.py. With stats off this costs
+    a single check per rule run and per grid entry.
     """
-    def __init__(self, num_players, card_to_catagory):
+    def __init__(self, num_players, card_to_catagory, bitset = False,
+                 collective_node_budget = 20000, collective_time_budget = None, marginal_cache_size = 4096,
+                 marginal_work_budget = 100000, stats = False):
         self._num_players = num_players
         self._card_to_catagory = card_to_catagory
         self._num_cards = len(card_to_catagory)
@@ -35,41 +55,120 @@ class Tableau:
         self._num_cards_in_play = self._num_cards - self._num_catagories
         self._hand_size = self._num_cards_in_play // num_players
         self._num_leftover_cards = self._num_cards_in_play % num_players
-        self._grid = {i:[0 for _ in range(self._num_cards)] for i in range(-1, num_players + 1)}
+        self._grid = (BitsetGrid if bitset else ListGrid)(num_players, card_to_catagory)
         self._column_states = {i:False for i in range(-1, num_players + 1)}
         self._row_states = [False for _ in range(self._num_cards)]
-        self._conditions = {i:[] for i in range(1, num_players + 1)}
+        self._conditions = {i:ConditionStore(self._num_cards) for i in range(1, num_players + 1)}
         self._assignment = Assignment(num_players, card_to_catagory)
+        self._deal_search = DealSearch(num_players, card_to_catagory, collective_node_budget, collective_time_budget)
+        self._marginal_counter = MarginalCounter(num_players, card_to_catagory, marginal_cache_size,
+                                                 marginal_work_budget)
+        # Counts new grid entries and conditions, so satisfy_collective can skip a grid it has fully searched
+        self._version = 0
+        self._collective_version = None
+        # ("grid", location, card), ("column", location, old state) or ("row", card, old state)
+        # for each change since the first checkpoint, None if there is no checkpoint
+        self._trail = None
+        self._checkpoints = []
+        # Rules waiting to be run by update, as (method name, row/column/catagory) pairs.
+        # Everything starts queued since some rules can find information on an empty grid.
+        self._queue = deque()
+        self._queued = set()
+        self._rule_invocations = {rule:0 for rule in ("_check_leftover", "_check_secret", "_check_player",
+                                                      "_check_card", "_satisfy_player")}
+        # TableauStats when stats are on, else None, and the rule being run for provenance
+        self._stats = TableauStats() if stats else None
+        self._current_rule = "input"
+        self._mark_dirty("_check_leftover", -1)
+        for catagory in range(self._num_catagories):
+            self._mark_dirty("_check_secret", catagory)
+        for p in range(1, num_players + 1):
+            self._mark_dirty("_check_player", p)
+            self._mark_dirty("_satisfy_player", p)
+        for c in range(self._num_cards):
+            self._mark_dirty("_check_card", c)
     def add_entry_to_grid(self, location: int, card: int, state: int):
         assert state in (-1, 1), "Invalid state given to Tableau"
-        if self._grid[location][card] != 0:
-            assert self._grid[location][card] == state, "Contradictory entry given to Tableau"
+        if self._stats != None:
+            self._stats.entry_calls += 1
+        current = self._grid.get(location, card)
+        if current != 0:
+            assert current == state, "Contradictory entry given to Tableau"
             # In this case there is no new information
             return
         # Otherwise the current grid point is 0 so we have new information
         if state == 1:
             assert self._assignment.try_assign(card, location), f"Information given to Tableau resulted in invalid assignment"
             # If a card location is known, then all other locations cannot have that card
-            self._grid[location][card] = state
+            self._set_grid(location, card, state)
+            if location > 0:
+                self._conditions[location].card_in(card)
             self.add_entries_to_grid([l for l in range(-1, self._num_players + 1) if l != location], card, -1)
-            self._row_states[card] = True
+            self._set_row_state(card, True)
             # that row is now completed
         else:
             # if there aren't at least two spots left, then since we checked above that this is new information
             # there is only one spot left which cannot be marked as -1
-            assert len(self.search_row(card, (0, 1))) >= 2, \
+            assert self._grid.count_row(card, (0, 1)) >= 2, \
             f"Tableau given information that prevents card {card} from being in any location"
             if location == -1:
-                assert len(self.search_column(location, (0, 1))) > self._num_leftover_cards, \
+                assert self._grid.count_column(location, (0, 1)) > self._num_leftover_cards, \
                 "Tableau given information that eliminates too many cards from being leftover"
             elif location == 0:
                 catagory = self._card_to_catagory[card]
-                assert len([c for c in self.search_column(location, (0, 1)) if self._card_to_catagory[c] == catagory]) > 1, \
+                assert self._grid.count_column(location, (0, 1), catagory) > 1, \
                 f"Tableau given information that elminates all cards in {catagory} from secret envelope"
             else:
-                assert len(self.search_column(location, (0, 1))) > self._hand_size, \
+                assert self._grid.count_column(location, (0, 1)) > self._hand_size, \
                 f"Tableau given information that prevents player {location} from having {self._hand_size} cards"
-            self._grid[location][card] = state
+            self._set_grid(location, card, state)
+            if location > 0 and self._conditions[location].card_out(card, lambda c: self._grid.get(location, c)):
+                self._mark_dirty("_satisfy_player", location)
+    def _set_grid(self, location, card, state):
+        self._grid.set(location, card, state)
+        if self._trail != None:
+            self._trail.append(("grid", location, card))
+        if self._stats != None:
+            self._stats.entries += 1
+            self._stats.provenance[(location, card)] = self._current_rule
+        self._mark_entry_dirty(location, card)
+    def _set_column_state(self, location, state):
+        if self._trail != None:
+            self._trail.append(("column", location, self._column_states[location]))
+        self._column_states[location] = state
+    def _set_row_state(self, card, state):
+        if self._trail != None:
+            self._trail.append(("row", card, self._row_states[card]))
+        self._row_states[card] = state
+    def push_checkpoint(self):
+        # Save the current state so that rollback can return to it, checkpoints can be nested
+        if self._trail == None:
+            self._trail = []
+        self._checkpoints.append((len(self._trail), list(self._queue), self._version, self._collective_version))
+        self._assignment.push_checkpoint()
+        for p in range(1, self._num_players + 1):
+            self._conditions[p].push_checkpoint()
+    def rollback(self):
+        # Return to the state when the last checkpoint was pushed and remove that checkpoint
+        assert len(self._checkpoints) > 0, "Tableau rolled back without a checkpoint"
+        mark, queue, self._version, self._collective_version = self._checkpoints.pop()
+        while len(self._trail) > mark:
+            change, index, value = self._trail.pop()
+            if change == "grid":
+                self._grid.clear(index, value)
+                if self._stats != None:
+                    self._stats.provenance.pop((index, value), None)
+            elif change == "column":
+                self._column_states[index] = value
+            else:
+                self._row_states[index] = value
+        if len(self._checkpoints) == 0:
+            self._trail = None
+        self._queue = deque(queue)
+        self._queued = set(queue)
+        self._assignment.rollback()
+        for p in range(1, self._num_players + 1):
+            self._conditions[p].rollback()
     def add_entries_to_grid(self, locations, cards, states):
         # At least one of players, cards, states should be iterable 
         assert type(locations) != int or type(cards) != int or type(states) != int, "add_entries_to_grid not given any iterables"
@@ -82,7 +181,7 @@ class Tableau:
         for l, c, s in zip(locations, cards, states):
             self.add_entry_to_grid(l, c, s)
     def check_grid(self, location, card):
-        return self._grid[location][card]
+        return self._grid.get(location, card)
     def print_grid(self):
         print(6 * " ", end = "")
         for l in range(-1, self._num_players + 1):
@@ -97,171 +196,280 @@ class Tableau:
                 s = " " + s
             print(s, end = "  ")
             for l in range(-1, self._num_players + 1):
-                s = 3 * " " + str(self._grid[l][c])
-                if self._grid[l][c] in (0, 1):
+                s = 3 * " " + str(self._grid.get(l, c))
+                if self._grid.get(l, c) in (0, 1):
                     s = " " + s
                 print(s, end = "  ")
             print()
     def search_column(self, location, condition):
         # condition int or tuple of ints
-        return [c for c in range(self._num_cards) 
-                if (self._grid[location][c] == condition if type(condition) == int else self._grid[location][c] in condition)]
+        return self._grid.search_column(location, condition)
     def search_row(self, card, condition):
         # condition int or tuple of ints
-        return [l for l in range(-1, self._num_players + 1) 
-                if (self._grid[l][card] == condition if type(condition) == int else self._grid[l][card] in condition)]
+        return self._grid.search_row(card, condition)
     def unkown_cards(self):
         return [c for c in range(self._num_cards) if not self._row_states[c]]
-    def iterate_leftover(self) -> bool:
+    def num_unknown_entries(self):
+        # Number of points on the grid that are still 0
+        return sum(self._grid.count_column(l, 0) for l in range(-1, self._num_players + 1))
+    def add_condition(self, player: int, cards):
+        # Record that player has at least one of cards in their hand
+        assert player >= 1 and player <= self._num_players, "Invalid player given to Tableau"
+        self._conditions[player].add(cards, lambda c: self._grid.get(player, c))
+        self._version += 1
+        self._mark_dirty("_satisfy_player", player)
+    def add_suggestion(self, suggester: int, cards, passed, shown_by = None, shown = None):
+        # Record the result of a suggestion of cards by suggester. Every player in passed has none of cards,
+        # and shown_by, if anyone, showed a card to the suggester. If the shown card is known, shown_by
+        # has it, otherwise shown_by has at least one of cards.
+        for p in passed:
+            self.add_entries_to_grid(p, cards, -1)
+        if shown_by == None:
+            return
+        if shown != None:
+            self.add_entry_to_grid(shown_by, shown, 1)
+        else:
+            self.add_condition(shown_by, cards)
+    def rule_invocations(self):
+        # Number of times each rule has been run by update, keyed by rule name
+        return dict(self._rule_invocations)
+    def enable_stats(self):
+        # Start recording stats from scratch, see stats.py
+        self._stats = TableauStats()
+    def disable_stats(self):
+        self._stats = None
+    def stats(self):
+        # The TableauStats being recorded, None if stats are off
+        return self._stats
+    def _run_rule(self, rule, *args):
+        # Runs a rule while recording it in the stats, returns what the rule returns
+        self._current_rule = rule
+        version = self._version
+        start = perf_counter()
+        try:
+            return getattr(self, rule)(*args)
+        finally:
+            self._stats.record_rule(rule, self._version - version, perf_counter() - start)
+            self._current_rule = "input"
+    def _mark_dirty(self, rule, arg):
+        if (rule, arg) not in self._queued:
+            self._queued.add((rule, arg))
+            self._queue.append((rule, arg))
+    def _mark_entry_dirty(self, location, card):
+        # Queue every rule that reads the grid point that just changed
+        self._version += 1
+        if location == -1:
+            self._mark_dirty("_check_leftover", -1)
+        elif location == 0:
+            self._mark_dirty("_check_secret", self._card_to_catagory[card])
+        else:
+            self._mark_dirty("_check_player", location)
+            self._mark_dirty("_satisfy_player", location)
+        self._mark_dirty("_check_card", card)
+    def _check_leftover(self, _ = None) -> bool:
         # Returns true if new information is found
         if self._column_states[-1]:
             return False
-        open_in_leftover = len(self.search_column(-1, (0, 1)))
+        open_in_leftover = self._grid.count_column(-1, (0, 1))
         assert open_in_leftover >= self._num_leftover_cards, "In Tableau it is not possible to have enough leftover cards"
         if open_in_leftover == self._num_leftover_cards: 
-            self._column_states[-1] = True
-            for c in range(self._num_cards):
-                if self._grid[-1][c] == 0:
-                    self.add_entry_to_grid(-1, c, 1)
+            self._set_column_state(-1, True)
+            for c in self.search_column(-1, 0):
+                self.add_entry_to_grid(-1, c, 1)
             return True
-        definite_in_leftover = len(self.search_column(-1, 1))
+        definite_in_leftover = self._grid.count_column(-1, 1)
         assert definite_in_leftover <= self._num_leftover_cards, "In Tableau too many cards have been set as leftover cards"
         if definite_in_leftover == self._num_leftover_cards:
-            self._column_states[-1] = True
-            for c in range(self._num_cards):
-                if self._grid[-1][c] == 0:
-                    self.add_entry_to_grid(-1, c, -1)
+            self._set_column_state(-1, True)
+            for c in self.search_column(-1, 0):
+                self.add_entry_to_grid(-1, c, -1)
             return True
         return False
-    def iterate_players(self) -> bool:
+    def _check_player(self, p) -> bool:
         # Returns true if new information is found
-        iterated = False
-        for p in range(1, self._num_players + 1):
-            if self._column_states[p]:
-                continue
-            open_in_hand = len(self.search_column(p, (0, 1)))
-            assert open_in_hand >= self._hand_size, \
-            f"In Tableau it is not possible to have enough cards in player {p}'s hand"
-            if open_in_hand == self._hand_size: 
-                self._column_states[p] = True
-                self._conditions[p] = []
-                for c in range(self._num_cards):
-                    if self._grid[p][c] == 0:
-                        self.add_entry_to_grid(p, c, 1)
-                return True
-            definite_in_hand = len(self.search_column(p, 1))
-            assert definite_in_hand <= self._hand_size, \
-            f"In Tableau too many cards have been put in player {p}'s hand"
-            if definite_in_hand == self._hand_size:
-                self._column_states[p] = True
-                self._conditions[p] = []
-                for c in range(self._num_cards):
-                    if self._grid[p][c] == 0:
-                        self.add_entry_to_grid(p, c, -1)
-                return True
+        if self._column_states[p]:
+            return False
+        open_in_hand = self._grid.count_column(p, (0, 1))
+        assert open_in_hand >= self._hand_size, \
+        f"In Tableau it is not possible to have enough cards in player {p}'s hand"
+        if open_in_hand == self._hand_size: 
+            self._set_column_state(p, True)
+            for c in self.search_column(p, 0):
+                self.add_entry_to_grid(p, c, 1)
+            assert self._conditions[p].all_met(lambda c: self._grid.get(p, c)), \
+            f"In Tableau player {p}'s hand is full without meeting their conditions"
+            self._conditions[p].clear()
+            return True
+        definite_in_hand = self._grid.count_column(p, 1)
+        assert definite_in_hand <= self._hand_size, \
+        f"In Tableau too many cards have been put in player {p}'s hand"
+        if definite_in_hand == self._hand_size:
+            # the rest of the column is ruled out, so any condition not already met never will be
+            assert self._conditions[p].all_met(lambda c: self._grid.get(p, c)), \
+            f"In Tableau player {p}'s hand is full without meeting their conditions"
+            self._set_column_state(p, True)
+            self._conditions[p].clear()
+            for c in self.search_column(p, 0):
+                self.add_entry_to_grid(p, c, -1)
+            return True
         return False
-    def iterate_secret(self) -> bool:
+    def _check_secret(self, catagory) -> bool:
+        # Returns true if new information is found
         if self._column_states[0]:
             return False
-        all_catagories_complete = True
         iterated = False
-        for catagory in range(self._num_catagories):
-            cards_in_catagory = [c for c in range(self._num_cards) if self._card_to_catagory[c] == catagory]
-            catagory_incomplete = len([c for c in self.search_column(0, 0) if c in cards_in_catagory]) > 0
-            all_catagories_complete = all_catagories_complete and not catagory_incomplete
-            if catagory_incomplete:
-                # if this succeeds, the catagory is incomplete
-                open_in_catagory = len([c for c in self.search_column(0, (0, 1)) if c in cards_in_catagory])
-                assert open_in_catagory >= 1, f"In Tableau secret envelope cannot have a card of catagory {catagory}"
-                if open_in_catagory == 1:
-                    for c in cards_in_catagory:
-                        if self._grid[0][c] == 0:
-                            self.add_entry_to_grid(0, c, 1)
-                    iterated = True
-                    continue
-                definite_in_catagory = len([c for c in self.search_column(0, 1) if c in cards_in_catagory])
-                assert definite_in_catagory <= 1, \
-                f"In Tableau secret envelope has more than one a card of catagory {catagory}"
-                if definite_in_catagory == 1:
-                    for c in cards_in_catagory:
-                        if self._grid[0][c] == 0:
-                            self.add_entry_to_grid(0, c, -1)
-                    iterated = True
-        self._column_states[0] = all_catagories_complete # only true after iteration if all catagories are complete
+        if self._grid.count_column(0, 0, catagory) > 0:
+            # if this succeeds, the catagory is incomplete
+            open_in_catagory = self._grid.count_column(0, (0, 1), catagory)
+            assert open_in_catagory >= 1, f"In Tableau secret envelope cannot have a card of catagory {catagory}"
+            definite_in_catagory = self._grid.count_column(0, 1, catagory)
+            assert definite_in_catagory <= 1, \
+            f"In Tableau secret envelope has more than one a card of catagory {catagory}"
+            if open_in_catagory == 1 or definite_in_catagory == 1:
+                state = 1 if open_in_catagory == 1 else -1
+                for c in self.search_column(0, 0):
+                    if self._card_to_catagory[c] == catagory:
+                        self.add_entry_to_grid(0, c, state)
+                iterated = True
+        if self._grid.count_column(0, 0) == 0:
+            self._set_column_state(0, True)
         return iterated
-    def iterate_cards(self) -> bool:
-        for c in range(self._num_cards):
-            if self._row_states[c]:
-                continue
-            open_in_row = len(self.search_row(c, (0, 1)))
-            assert open_in_row >= 1, f"In Tableau, there is no location for card {c}"
-            if open_in_row == 1:
-                self._row_states[c] = True
-                for l in range(-1, self._num_players + 1):
-                    if self._grid[l][c] == 0:
-                        self.add_entry_to_grid(l, c, 1)
-                        # only one location in row is open, so we can break
-                        break
-                # since the grid was updated, we return 
-                return True
+    def _check_card(self, c) -> bool:
+        # Returns true if new information is found
+        if self._row_states[c]:
+            return False
+        open_in_row = self._grid.count_row(c, (0, 1))
+        assert open_in_row >= 1, f"In Tableau, there is no location for card {c}"
+        if open_in_row == 1:
+            self._set_row_state(c, True)
+            for l in self.search_row(c, 0):
+                self.add_entry_to_grid(l, c, 1)
+                # only one location in row is open, so we can break
+                break
+            return True
         return False
+    def _satisfy_player(self, p) -> bool:
+        # Returns true if new information is found
+        if self._column_states[p]:
+            return False
+        # Conditions are simplified as cards are ruled out of player p's hand, e.g.
+        # player has White or Knife or Ballroom and Knife and White are ruled out so
+        # player has Ballroom. Cards found this way are units waiting in the condition store.
+        units = self._conditions[p].take_units()
+        for card in units:
+            self.add_entry_to_grid(p, card, 1)
+        return len(units) > 0
+    def iterate_leftover(self) -> bool:
+        # Returns true if new information is found
+        return self._check_leftover()
+    def iterate_players(self) -> bool:
+        # Returns true if new information is found
+        return any(self._check_player(p) for p in range(1, self._num_players + 1))
+    def iterate_secret(self) -> bool:
+        # Returns true if new information is found
+        return any([self._check_secret(catagory) for catagory in range(self._num_catagories)])
+    def iterate_cards(self) -> bool:
+        # Returns true if new information is found
+        return any(self._check_card(c) for c in range(self._num_cards))
     def satisfy_players(self) -> bool:
-        for p in range(1, self._num_players + 1):
-            if self._column_states[p]:
-                continue
-            not_in_hand = self.search_column(p, -1)
-            maybe_in_hand = self.search_column(p, 0)
-            definite_in_hand = tuple(self.search_column(p, 1))
-            remaining_hand_size = self._hand_size - len(definite_in_hand)
-            assert remaining_hand_size >= 0, f"In Tableau, player {p} has too big of a hand"
-            # first we remove conditions that are already satisfied since they aren't relevant anymore
-            # we also simplify conditions by removing clauses that cannot be satisfied, e.g.
-            # player has White or Knife or Ballroom and Ballroom is in not_in_hand so 
-            # player has White or Ballroom
-            i = 0
-            while i < len(self._conditions[p]):
-                if cards_satisfy_cond(definite_in_hand, self._conditions[p][i]):
-                    self._conditions[p].pop(i)
-                    continue
-                new_condition = tuple([c for c in self._conditions[p][i] if not c in not_in_hand])
-                assert len(new_condition) > 0, "In Tableau, a condition that cannot be satisfied has been found"
-                if len(new_condition) == 1:
-                    # a condition with one card means player p has that card in their hand, thus new information is found
-                    self.add_entry_to_grid(p, new_condition[0], 1)
-                    return True
-                i += 1
-            if len(self._conditions[p]) == 0:
-                # if there are no conditions, any assignment is valid
-                continue
-            # at this stage there are some remaining non-trivial conditions
-        return False
-    def satisfy_collective(self) -> bool:
-        return False
+        # Returns true if new information is found
+        return any(self._satisfy_player(p) for p in range(1, self._num_players + 1))
+    def candidates(self):
+        # Returns a list, indexed by card, of the locations that card hasn't been ruled out of
+        return [self.search_row(c, (0, 1)) for c in range(self._num_cards)]
+    def open_conditions(self):
+        # Conditions that haven't been satisfied, without the cards ruled out of each player's hand
+        return {p:[tuple(c for c in clause if self._grid.get(p, c) != -1) for clause in self._conditions[p].clauses()]
+                for p in range(1, self._num_players + 1)}
+    def marginals(self):
+        # Returns a list, indexed by card, of dicts from location to the probability the card is there,
+        # with every deal consistent with the grid and conditions equally likely.
+        # Counting exactly is only quick once most of a hand is known, normally the player's own hand.
+        # Early in a game with no hand given, raises MarginalBudgetExceeded when counting would try
+        # more than marginal_work_budget hands, and sampler.sample_until should be used instead.
+        candidates = self.candidates()
+        total, counts = self._marginal_counter.marginals(candidates, self.open_conditions())
+        assert total > 0, "In Tableau, no deal is consistent with the information given"
+        return [{l:n / total for l, n in counts[c].items()} for c in range(self._num_cards)]
+    def most_likely_solution(self):
+        # Returns, for each catagory, the card most likely to be in the secret envelope and its probability
+        marginals = self.marginals()
+        solution = []
+        for catagory in range(self._num_catagories):
+            cards = [c for c in range(self._num_cards) if self._card_to_catagory[c] == catagory]
+            card = max(cards, key = lambda c: marginals[c].get(0, 0))
+            solution.append((card, marginals[card].get(0, 0)))
+        return solution
+    def marginal_stats(self):
+        # Counters of the sub-count cache behind marginals
+        return self._marginal_counter.stats()
+    def set_collective_budget(self, node_budget, time_budget = None):
+        # Change the budget of the deal search behind satisfy_collective, a node budget of 0 turns it off
+        self._deal_search.node_budget = node_budget
+        self._deal_search.time_budget = time_budget
+    def collective_stats(self):
+        # Counters of the deal search behind satisfy_collective
+        return self._deal_search.stats()
+    def satisfy_collective(self, new_budget = True) -> bool:
+        # Returns true if new information is found. With new_budget False the search spends what
+        # is left of the budget started by update instead of starting its own.
+        if self._deal_search.node_budget == 0 or self._collective_version == self._version:
+            return False
+        if all(self._row_states):
+            return False
+        if not new_budget and not self._deal_search.budget_left():
+            return False
+        candidates = self.candidates()
+        conditions = self.open_conditions()
+        exhausted = self._deal_search.budget_exhausted
+        impossible = self._deal_search.impossible_entries(candidates, conditions, new_budget)
+        for location, card in impossible:
+            self.add_entry_to_grid(location, card, -1)
+        if self._deal_search.budget_exhausted == exhausted and len(impossible) == 0:
+            # every deal was accounted for, so nothing more can be found until new information is given
+            self._collective_version = self._version
+        return len(impossible) > 0
     def update(self):
         # update is how the Tableau deduces new information about the location of the cards.
-        # It loops through each deduction step, and if new information is discovered
-        # then the loop restarts. If all the deduction steps are completed and no new
-        # information is discovered, then the loop is exited.
+        # Every new grid entry or condition queues the rules that read its row, column or
+        # conditions, and update runs queued rules until none are left. The rules are:
+        #   _check_leftover, basic checks on the leftover cards column
+        #   _check_secret, basic checks on one catagory of the secret cards column
+        #   _check_player, basic checks on one player column
+        #   _check_card, checks if the possible locations of one card have dropped to 1
+        #   _satisfy_player, checks the conditions on one player's hand
+        # Once nothing is queued, the conditions on all players together are checked, and
+        # if that finds new information the queue is drained again. Every round of that
+        # search shares one budget for the whole update.
+        self._deal_search.start_budget()
+        if self._stats != None:
+            return self._update_with_stats()
         while True:
-            # do basic checks on the leftover cards column
-            if self.iterate_leftover():
-                continue
-            # do basic checks on the secret cards column
-            if self.iterate_secret():
-                continue
-            # do basic checks on each player column
-            if self.iterate_players():
-                continue
-            # check each card to see if the possible locations it can be have dropped to 1
-            if self.iterate_cards():
-                continue
-            # checks conditions on each individual players hand to see if any information can be found
-            # e.g. A player must have a certain card in their hand, or they must not have a certain card
-            if self.satisfy_players():
-                continue
+            while self._queue:
+                rule, arg = self._queue.popleft()
+                self._queued.discard((rule, arg))
+                self._rule_invocations[rule] += 1
+                getattr(self, rule)(arg)
             # checks conditions on all players together to see if any information can be found
             # e.g. A certain player must have a certain card in their hand, or
             # a certain player must not have a certain card in their hand
-            if self.satisfy_collective():
-                continue
-            break
+            if not self.satisfy_collective(False):
+                break
+    def _update_with_stats(self):
+        # The same as update, timing every rule and counting the rounds it takes
+        start = perf_counter()
+        rounds = 0
+        rules_run = 0
+        try:
+            while True:
+                rounds += 1
+                while self._queue:
+                    rule, arg = self._queue.popleft()
+                    self._queued.discard((rule, arg))
+                    self._rule_invocations[rule] += 1
+                    rules_run += 1
+                    self._run_rule(rule, arg)
+                if not self._run_rule("satisfy_collective", False):
+                    break
+        finally:
+            self._stats.record_update(rounds, rules_run, perf_counter() - start)
@@ -0,0 +1,70 @@
+import random
+import pytest
+from batch import BatchTableau
+from benchmarks.generator import generate_game
+from tableau import Tableau
+from tracker import card_to_catagory
+
+def game_facts(game, rng, contradictory):
+    # The facts of a synthetic game as ("entry", location, card, state) and ("condition", player, cards),
+    # with two random cards added to random hands when contradictory, which usually can't all be true
+    facts = [("entry", game["player"], card, 1) for card in game["hand"]]
+    facts += [("entry", -1, card, 1) for card in game["leftover"]]
+    for suggestion in game["suggestions"][:rng.randint(0, len(game["suggestions"]))]:
+        facts += [("entry", p, card, -1) for p in suggestion["passed"] for card in suggestion["cards"]]
+        if suggestion.get("shown") != None:
+            facts.append(("entry", suggestion["shown_by"], suggestion["shown"], 1))
+        elif suggestion.get("shown_by") != None:
+            facts.append(("condition", suggestion["shown_by"], suggestion["cards"]))
+    if contradictory:
+        for _ in range(2):
+            facts.append(("entry", rng.randint(1, game["num_players"]), rng.randrange(len(card_to_catagory)), 1))
+    return facts
+
+@pytest.mark.parametrize("num_players", [3, 4, 5, 6])
+def test_batch_matches_tableau(num_players):
+    num_games = 60
+    batch = BatchTableau(num_games, num_players, card_to_catagory)
+    tableaux = []
+    for game_number in range(num_games):
+        seed = num_players * 1000 + game_number
+        game, _ = generate_game(num_players, seed)
+        facts = game_facts(game, random.Random(seed), game_number % 5 == 0)
+        for fact in facts:
+            if fact[0] == "entry":
+                batch.add_entry(game_number, *fact[1:])
+            else:
+                batch.add_condition(game_number, *fact[1:])
+        tableau = Tableau(num_players, card_to_catagory, collective_node_budget = 0)
+        try:
+            for fact in facts:
+                if fact[0] == "entry":
+                    tableau.add_entry_to_grid(*fact[1:])
+                else:
+                    tableau.add_condition(*fact[1:])
+            tableau.update()
+        except AssertionError:
+            tableau = None
+        tableaux.append(tableau)
+    batch.update()
+    assert any(tableau == None for tableau in tableaux)
+    for game_number, tableau in enumerate(tableaux):
+        assert batch.valid[game_number] == (tableau != None), game_number
+        if tableau != None:
+            for l in range(-1, num_players + 1):
+                for c in range(len(card_to_catagory)):
+                    assert batch.check_grid(game_number, l, c) == tableau.check_grid(l, c), (game_number, l, c)
+
+def test_full_hand_without_condition_met_is_contradictory():
+    # Player 2 has one of 0, 6 and 12, then their whole hand turns out to be 1, 7 and 13
+    batch = BatchTableau(1, 6, card_to_catagory)
+    tableau = Tableau(6, card_to_catagory, collective_node_budget = 0)
+    batch.add_condition(0, 2, (0, 6, 12))
+    tableau.add_condition(2, (0, 6, 12))
+    for card in (1, 7, 13):
+        batch.add_entry(0, 2, card, 1)
+        tableau.add_entry_to_grid(2, card, 1)
+    batch.update()
+    assert not batch.valid[0]
+    with pytest.raises(AssertionError):
+        tableau.update()
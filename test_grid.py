@@ -0,0 +1,41 @@
+import pytest
+from benchmarks.generator import generate_game
+from tableau import Tableau
+from tracker import card_to_catagory
+
+def add_turn(tableau, game, turn):
+    # Adds a turn of a synthetic game to a Tableau, turn 0 being the player's hand and the leftover cards
+    if turn == 0:
+        for card in game["hand"]:
+            tableau.add_entry_to_grid(game["player"], card, 1)
+        for card in game["leftover"]:
+            tableau.add_entry_to_grid(-1, card, 1)
+    else:
+        suggestion = game["suggestions"][turn - 1]
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion["passed"],
+                               suggestion.get("shown_by"), suggestion.get("shown"))
+
+def assert_same(list_tableau, bitset_tableau):
+    num_players = list_tableau._num_players
+    for l in range(-1, num_players + 1):
+        for condition in (-1, 0, 1, (0, 1), (-1, 0)):
+            assert list_tableau.search_column(l, condition) == bitset_tableau.search_column(l, condition)
+        for c in range(len(card_to_catagory)):
+            assert list_tableau.check_grid(l, c) == bitset_tableau.check_grid(l, c)
+    for c in range(len(card_to_catagory)):
+        for condition in (-1, 0, 1, (0, 1), (-1, 0)):
+            assert list_tableau.search_row(c, condition) == bitset_tableau.search_row(c, condition)
+    assert list_tableau._column_states == bitset_tableau._column_states
+    assert list_tableau._row_states == bitset_tableau._row_states
+
+@pytest.mark.parametrize("seed", range(12))
+def test_bitset_grid_matches_list_grid(seed):
+    num_players = 3 + seed % 4
+    game, _ = generate_game(num_players, seed)
+    list_tableau = Tableau(num_players, card_to_catagory, collective_node_budget = 2000)
+    bitset_tableau = Tableau(num_players, card_to_catagory, bitset = True, collective_node_budget = 2000)
+    for turn in range(len(game["suggestions"]) + 1):
+        for tableau in (list_tableau, bitset_tableau):
+            add_turn(tableau, game, turn)
+            tableau.update()
+        assert_same(list_tableau, bitset_tableau)
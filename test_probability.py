@@ -0,0 +1,36 @@
+import pytest
+from benchmarks.generator import generate_game
+from probability import MarginalBudgetExceeded
+from tableau import Tableau
+from tracker import card_to_catagory
+
+def test_marginals_with_leftover_unknown():
+    # Only the player's hand is given, so the leftover cards are counted along with the other hands
+    game, _ = generate_game(5, 1, 10)
+    tableau = Tableau(5, card_to_catagory, collective_node_budget = 0)
+    for card in game["hand"]:
+        tableau.add_entry_to_grid(game["player"], card, 1)
+    for suggestion in game["suggestions"]:
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion["passed"],
+                               suggestion.get("shown_by"), suggestion.get("shown"))
+    tableau.update()
+    marginals = tableau.marginals()
+    for card in range(tableau._num_cards):
+        assert sum(marginals[card].values()) == pytest.approx(1)
+    # on average each location holds as many cards as it is dealt
+    sizes = {l:(tableau._num_leftover_cards if l == -1 else tableau._num_catagories if l == 0 else tableau._hand_size)
+             for l in range(-1, 6)}
+    for location, size in sizes.items():
+        assert sum(marginals[c].get(location, 0) for c in range(tableau._num_cards)) == pytest.approx(size)
+    assert len([c for c in range(tableau._num_cards) if 0 < marginals[c].get(-1, 0) < 1]) > 0
+
+def test_marginals_without_hand_exceeds_budget():
+    game, _ = generate_game(4, 0, 10)
+    tableau = Tableau(4, card_to_catagory, collective_node_budget = 0, marginal_work_budget = 20000)
+    for suggestion in game["suggestions"]:
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion["passed"],
+                               suggestion.get("shown_by"))
+    tableau.update()
+    for _ in range(2):
+        with pytest.raises(MarginalBudgetExceeded):
+            tableau.marginals()
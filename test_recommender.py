@@ -0,0 +1,20 @@
+from recommender import recommend, suggestion_outcomes
+from sampler import sample_deals
+from test_sampler import cycle_tableau
+
+def test_outcomes_cover_every_deal():
+    # Cards 6 and 12 are in the secret envelope and card 1 is with player 1 or player 2,
+    # so when player 3 suggests them, player 1 shows card 1 or passes about equally often
+    tableau = cycle_tableau()
+    deals = sample_deals(tableau, 200)
+    outcomes = suggestion_outcomes(deals, 3, (1, 6, 12), 3)
+    assert set(outcomes) == {((), 1, 1), ((1,), 2, 1)}
+    assert abs(outcomes[((), 1, 1)] - 0.5) < 0.15
+
+def test_recommend_leaves_tableau_unchanged():
+    tableau = cycle_tableau()
+    before = [tableau.search_row(c, 0) for c in range(tableau._num_cards)]
+    scores = recommend(tableau, 3, num_workers = 1, num_deals = 40)
+    assert len(scores) == 5
+    assert scores[0][0] > 0
+    assert [tableau.search_row(c, 0) for c in range(tableau._num_cards)] == before
@@ -0,0 +1,32 @@
+import io
+import json
+import pytest
+from benchmarks.generator import generate_game
+from replay import replay, replay_line
+
+def test_bad_lines_are_reported_and_skipped():
+    good, _ = generate_game(4, 0)
+    bad_card = dict(good, id = "bad-card", suggestions = [{"suggester": 1, "cards": [2, 8, 40], "passed": [2]}])
+    lines = [json.dumps(good), "not json", json.dumps({"id": "no-players"}), json.dumps(bad_card), "[1, 2]", "",
+             json.dumps(good)]
+    out = io.StringIO()
+    assert replay(lines, out, collective_node_budget = 0) == 6
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result.get("id") for result in results] == [good["id"], None, "no-players", "bad-card", None, good["id"]]
+    assert ["error" in result for result in results] == [False, True, True, True, True, False]
+    assert results[0] == results[5]
+
+@pytest.mark.parametrize("suggestion", [{"suggester": 1, "cards": [2, 8, 14], "passed": [0]},
+                                        {"suggester": 1, "cards": [2, 8, 14], "passed": [], "shown_by": -1, "shown": 2},
+                                        {"suggester": 9, "cards": [2, 8, 14], "passed": [2]},
+                                        {"suggester": 1, "cards": [2], "passed": [2]},
+                                        {"suggester": 1, "cards": [2, 8, 14], "passed": [1]},
+                                        {"suggester": 1, "cards": [2, 8, 14], "passed": [2], "shown_by": 3, "shown": 5}])
+def test_bad_suggestions_are_errors(suggestion):
+    result = json.loads(replay_line(json.dumps({"id": "bad", "num_players": 4, "suggestions": [suggestion]}), 0))
+    assert result["id"] == "bad" and "error" in result
+
+def test_bad_hand_is_an_error():
+    for game in ({"num_players": 4, "player": 0, "hand": [1]}, {"num_players": 4, "player": 1, "hand": [21]},
+                 {"num_players": 1}, {"num_players": 4, "leftover": [-1]}):
+        assert "error" in json.loads(replay_line(json.dumps(game), 0))
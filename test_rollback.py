@@ -0,0 +1,61 @@
+import random
+import pytest
+from benchmarks.generator import generate_game
+from tableau import Tableau
+from test_grid import add_turn
+from tracker import card_to_catagory
+
+def state(tableau):
+    # Everything rollback has to restore
+    locations = range(-1, tableau._num_players + 1)
+    assignment = tableau._assignment
+    return ([[tableau.check_grid(l, c) for c in range(tableau._num_cards)] for l in locations],
+            dict(tableau._column_states), list(tableau._row_states),
+            {p:(store.clauses(), list(store._units), len(store)) for p, store in tableau._conditions.items()},
+            list(assignment._card_to_assignment), {l:set(cards) for l, cards in assignment._assignment_to_cards.items()},
+            dict(assignment._secret_by_catagory), list(tableau._queue), set(tableau._queued),
+            tableau._version, tableau._collective_version)
+
+def branch(tableau, rng):
+    # Adds a few random facts and updates, returns False if they contradicted the Tableau
+    try:
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.3:
+                tableau.add_condition(rng.randint(1, tableau._num_players), rng.sample(range(tableau._num_cards), 3))
+            else:
+                tableau.add_entry_to_grid(rng.randint(-1, tableau._num_players), rng.randrange(tableau._num_cards),
+                                          rng.choice([1, -1]))
+        tableau.update()
+    except AssertionError:
+        return False
+    return True
+
+@pytest.mark.parametrize("seed", range(8))
+def test_rollback_restores_state(seed):
+    num_players = 3 + seed % 4
+    game, _ = generate_game(num_players, seed)
+    rng = random.Random(seed)
+    options = {"bitset": seed % 2 == 0, "collective_node_budget": (0, 2000)[seed // 2 % 2]}
+    tableau = Tableau(num_players, card_to_catagory, **options)
+    twin = Tableau(num_players, card_to_catagory, **options)
+    results = set()
+    for turn in range(len(game["suggestions"]) + 1):
+        add_turn(tableau, game, turn)
+        add_turn(twin, game, turn)
+        # sometimes branch before update, with rules still queued
+        if rng.random() < 0.5:
+            tableau.update()
+            twin.update()
+        before = state(tableau)
+        for depth in range(rng.randint(1, 3)):
+            tableau.push_checkpoint()
+            results.add(branch(tableau, rng))
+        while len(tableau._checkpoints) > 0:
+            tableau.rollback()
+        assert state(tableau) == before, turn
+        assert tableau._trail == None
+    # both kinds of branch were rolled back
+    assert results == {True, False}
+    tableau.update()
+    twin.update()
+    assert state(tableau)[:3] == state(twin)[:3]
@@ -0,0 +1,76 @@
+from benchmarks.generator import generate_game
+from sampler import sample_deals, sample_until
+from tableau import Tableau
+from tracker import card_to_catagory
+
+def cycle_tableau():
+    # Every card is known except 1, 2 and 3, which are in one of the two deals
+    # (1 to player 1, 2 to player 2, 3 to player 3) or (1 to player 2, 2 to player 3, 3 to player 1),
+    # and no swap of two cards gets from one to the other
+    tableau = Tableau(3, card_to_catagory)
+    for card in (0, 6, 12):
+        tableau.add_entry_to_grid(0, card, 1)
+    rest = [c for c in range(len(card_to_catagory)) if c not in (0, 1, 2, 3, 6, 12)]
+    for i, card in enumerate(rest):
+        tableau.add_entry_to_grid(i // 5 + 1, card, 1)
+    tableau.add_entry_to_grid(3, 1, -1)
+    tableau.add_entry_to_grid(1, 2, -1)
+    tableau.add_entry_to_grid(2, 3, -1)
+    tableau.update()
+    return tableau
+
+def long_cycle_tableau():
+    # 6 players with every card known except 1, 2, 3, 4, 5 and 7, where the i-th of them can only be with
+    # player i or the next player around, leaving two deals that differ by moving all six cards
+    tableau = Tableau(6, card_to_catagory)
+    for card in (0, 6, 12):
+        tableau.add_entry_to_grid(0, card, 1)
+    cycle = [1, 2, 3, 4, 5, 7]
+    rest = [c for c in range(len(card_to_catagory)) if c not in cycle + [0, 6, 12]]
+    for i, card in enumerate(rest):
+        tableau.add_entry_to_grid(i // 2 + 1, card, 1)
+    for i, card in enumerate(cycle):
+        for l in range(-1, 7):
+            if l not in (i + 1, (i + 1) % 6 + 1):
+                tableau.add_entry_to_grid(l, card, -1)
+    tableau.update()
+    return tableau
+
+def game_tableau(num_players, seed, num_suggestions):
+    game, _ = generate_game(num_players, seed, num_suggestions)
+    tableau = Tableau(num_players, card_to_catagory, collective_node_budget = 0)
+    for card in game["hand"]:
+        tableau.add_entry_to_grid(game["player"], card, 1)
+    for card in game["leftover"]:
+        tableau.add_entry_to_grid(-1, card, 1)
+    for suggestion in game["suggestions"]:
+        tableau.add_suggestion(suggestion["suggester"], suggestion["cards"], suggestion["passed"],
+                               suggestion.get("shown_by"), suggestion.get("shown"))
+    tableau.update()
+    return tableau
+
+def assert_close(tableau, estimate, tolerance):
+    exact = tableau.marginals()
+    for card in range(tableau._num_cards):
+        for location in range(-1, tableau._num_players + 1):
+            assert abs(estimate.probability(card, location) - exact[card].get(location, 0)) <= tolerance, (card, location)
+
+def test_sampler_reaches_deals_a_swap_cannot():
+    tableau = cycle_tableau()
+    assert tableau.marginals()[1] == {1: 0.5, 2: 0.5}
+    assert len(set(tuple(deal) for deal in sample_deals(tableau, 200))) == 2
+    estimate = sample_until(tableau, tolerance = 0.03, num_workers = 1)
+    assert_close(tableau, estimate, 0.06)
+
+def test_sampler_reaches_deals_across_a_long_cycle():
+    tableau = long_cycle_tableau()
+    assert tableau.marginals()[1] == {1: 0.5, 2: 0.5}
+    assert len(set(tuple(deal) for deal in sample_deals(tableau, 200, num_chains = 1))) == 2
+    estimate = sample_until(tableau, tolerance = 0.03, num_workers = 1)
+    assert_close(tableau, estimate, 0.06)
+
+def test_sampler_matches_marginals_with_conditions():
+    tableau = game_tableau(4, 3, 8)
+    assert sum(len(clauses) for clauses in tableau.open_conditions().values()) > 0
+    estimate = sample_until(tableau, tolerance = 0.03, num_workers = 1)
+    assert_close(tableau, estimate, 0.06)
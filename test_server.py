@@ -0,0 +1,39 @@
+import asyncio
+from server import TrackerServer
+
+def run(commands):
+    # Sends each command to a new server in turn and returns the replies
+    async def send():
+        server = TrackerServer(max_workers = 1, collective_node_budget = 0)
+        try:
+            return [await server.handle(command) for command in commands]
+        finally:
+            server.close()
+    return asyncio.run(send())
+
+def test_bad_input_does_not_stop_the_game():
+    replies = run([{"command": "create_game", "game": "g", "num_players": 4, "player": 1, "hand": [0, 7, 15, 20]},
+                   {"command": "add_fact", "game": "g", "location": 2, "card": 3, "state": 0},
+                   {"command": "add_fact", "game": "g", "location": 5, "card": 3, "state": 1},
+                   {"command": "add_suggestion", "game": "g", "suggester": 1, "cards": [2, 8, 14], "passed": [2, 9]},
+                   {"command": "add_suggestion", "game": "g", "suggester": 1, "cards": [2, 8, 40], "passed": [2]},
+                   {"command": "add_suggestion", "game": "g", "suggester": 1, "cards": [2, 8, 14], "shown_by": 7},
+                   {"command": "add_suggestion", "game": "g", "suggester": 1, "cards": [2, 8, 14], "shown_by": 2, "shown": 3},
+                   {"command": "add_fact", "game": "g", "location": 2, "card": 3, "state": 1},
+                   {"command": "query_grid", "game": "g"}])
+    assert replies[0]["ok"]
+    assert not any(reply["ok"] for reply in replies[1:7])
+    assert replies[7]["ok"]
+    assert replies[8]["grid"]["2"][3] == 1
+    # none of the rejected suggestions were partly added
+    assert replies[8]["grid"]["2"][2] == 0 and replies[8]["grid"]["2"][8] == 0
+    assert replies[8]["error"] == None
+
+def test_contradiction_stops_the_game():
+    replies = run([{"command": "create_game", "game": "g", "num_players": 4, "player": 1, "hand": [0, 7, 15, 20]},
+                   {"command": "add_fact", "game": "g", "location": 2, "card": 0, "state": 1},
+                   {"command": "add_fact", "game": "g", "location": 2, "card": 3, "state": 1},
+                   {"command": "query_grid", "game": "g"}])
+    assert replies[0]["ok"] and not replies[1]["ok"] and not replies[2]["ok"]
+    assert "contradictory" in replies[2]["error"]
+    assert replies[3]["error"] != None
@@ -0,0 +1,84 @@
+import os
+import pytest
+from benchmarks.generator import generate_game
+from snapshot import dumps, loads, RECORD, SnapshotArchive
+from tableau import Tableau
+from test_grid import add_turn
+from tracker import card_to_catagory
+
+def state(tableau):
+    # Everything a snapshot keeps. A loaded condition with one card left that isn't ruled out becomes
+    # a unit straight away, so each player's conditions and units are compared by the cards still open
+    locations = range(-1, tableau._num_players + 1)
+    conditions = {}
+    for p, store in tableau._conditions.items():
+        clauses = store.clauses() + [(card,) for card in store._units]
+        conditions[p] = set(frozenset(c for c in clause if tableau.check_grid(p, c) != -1) for clause in clauses
+                            if not any(tableau.check_grid(p, c) == 1 for c in clause))
+    return ([[tableau.check_grid(l, c) for c in range(tableau._num_cards)] for l in locations],
+            dict(tableau._column_states), list(tableau._row_states), conditions)
+
+def replayed(num_players, seed, turns, bitset):
+    # A Tableau with the first turns of a synthetic game, updated after all but the last
+    game, _ = generate_game(num_players, seed)
+    tableau = Tableau(num_players, card_to_catagory, bitset = bitset, collective_node_budget = 0)
+    for turn in range(turns):
+        if turn > 0:
+            tableau.update()
+        add_turn(tableau, game, turn)
+    return tableau
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("bitset", [False, True])
+def test_snapshot_round_trip(seed, bitset):
+    num_players = 3 + seed % 4
+    game, _ = generate_game(num_players, seed)
+    tableau = Tableau(num_players, card_to_catagory, bitset = bitset, collective_node_budget = 0)
+    for turn in range(len(game["suggestions"]) + 1):
+        add_turn(tableau, game, turn)
+        # once before update, with units and new entries not yet used, and once after
+        for _ in range(2):
+            data = dumps(tableau)
+            loaded = loads(data)
+            assert state(loaded) == state(tableau)
+            assert isinstance(loaded._grid, type(tableau._grid))
+            assert state(loads(dumps(loaded))) == state(tableau)
+            tableau.update()
+
+def test_snapshot_before_update_deduces_the_same():
+    for bitset in (False, True):
+        tableau = replayed(3, 0, 20, bitset)
+        assert any(len(store._units) > 0 for store in tableau._conditions.values())
+        loaded = loads(dumps(tableau), bitset = not bitset)
+        tableau.update()
+        loaded.update()
+        assert state(loaded) == state(tableau)
+
+def test_archive(tmp_path):
+    path = str(tmp_path / "games.clta")
+    early = replayed(4, 2, 3, True)
+    late = replayed(4, 2, 9, True)
+    other = replayed(5, 3, 6, False)
+    with SnapshotArchive(path) as archive:
+        archive.append("a", early)
+        archive.append("b", other)
+        archive.append("a", late)
+        assert len(archive) == 2 and archive.game_ids() == ["a", "b"]
+        assert state(archive.load("a")) == state(late)
+    # a crash part way through appending leaves a record cut short, which is ignored
+    size = os.path.getsize(path)
+    with SnapshotArchive(path) as archive:
+        archive.append("c", early)
+    os.truncate(path, os.path.getsize(path) - 5)
+    with SnapshotArchive(path) as archive:
+        assert archive.game_ids() == ["a", "b"]
+        assert "c" not in archive
+        assert state(archive.load("b")) == state(other)
+        archive.append("c", other)
+        # written over the record cut short
+        assert os.path.getsize(path) == size + RECORD.size + 1 + len(dumps(other))
+    with SnapshotArchive(path) as archive:
+        assert len(archive) == 3
+        assert state(archive.load("a")) == state(late)
+        assert state(archive.load("c")) == state(other)
+        assert state(archive.load("c", bitset = True)) == state(other)
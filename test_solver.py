@@ -0,0 +1,43 @@
+import pytest
+import solver
+from benchmarks.generator import generate_game
+from tableau import Tableau
+from test_grid import add_turn
+from tracker import card_to_catagory
+
+@pytest.mark.parametrize("seed", range(4))
+def test_collective_budget_covers_whole_update(seed):
+    game, deal = generate_game(6, seed)
+    tableau = Tableau(6, card_to_catagory, collective_node_budget = 300)
+    for turn in range(len(game["suggestions"]) + 1):
+        add_turn(tableau, game, turn)
+        before = tableau.collective_stats()["nodes_explored"]
+        tableau.update()
+        assert tableau.collective_stats()["nodes_explored"] - before <= 301
+    # the search only ever rules out locations the cards aren't in
+    for card, location in enumerate(deal):
+        assert tableau.check_grid(location, card) != -1
+
+class FakeClock:
+    # Stands in for the time module in solver.py, each reading is tick seconds after the last
+    def __init__(self, tick):
+        self.tick = tick
+        self.now = 0.0
+    def perf_counter(self):
+        self.now += self.tick
+        return self.now
+
+def test_collective_time_budget_covers_whole_update(monkeypatch):
+    # The deadline is checked every 256 nodes, so a budget of 5 ticks allows at most a few checks in an update
+    monkeypatch.setattr(solver, "time", FakeClock(0.01))
+    game, _ = generate_game(6, 1)
+    tableau = Tableau(6, card_to_catagory, collective_node_budget = None, collective_time_budget = 0.05)
+    exhausted = 0
+    for turn in range(len(game["suggestions"]) + 1):
+        add_turn(tableau, game, turn)
+        before = tableau.collective_stats()
+        tableau.update()
+        after = tableau.collective_stats()
+        assert after["nodes_explored"] - before["nodes_explored"] <= 256 * 6
+        exhausted += after["budget_exhausted"] > before["budget_exhausted"]
+    assert exhausted > 0
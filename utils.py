@@ -13,3 +13,39 @@ def input_unsigned_int(prompt: str, lb = None, ub = None, err = None) -> int:
             num = None
     return num
 
+
+# Checks of game information read from outside, such as game logs or commands sent to the server,
+# raising an AssertionError with a message for the first thing wrong
+
+def check_setup(num_players, card_to_catagory):
+    assert type(card_to_catagory) in (list, tuple) and all(type(k) == int for k in card_to_catagory) and \
+           set(card_to_catagory) == set(range(len(set(card_to_catagory)))), \
+    "card_to_catagory must be a list of catagory numbers counting up from 0"
+    assert type(num_players) == int and 2 <= num_players <= len(card_to_catagory) - len(set(card_to_catagory)), \
+    f"Invalid number of players {num_players}"
+
+def check_player(player, num_players) -> int:
+    assert type(player) == int and 1 <= player <= num_players, f"No player {player}"
+    return player
+
+def check_cards(cards, num_cards) -> list:
+    assert type(cards) in (list, tuple), "cards must be a list"
+    for card in cards:
+        assert type(card) == int and 0 <= card < num_cards, f"No card {card}"
+    return list(cards)
+
+def check_suggestion(card_to_catagory, num_players, suggester, cards, passed, shown_by = None, shown = None):
+    # A suggestion is one card of each catagory, passed on by players other than the suggester,
+    # and shown by one more player if anyone, who showed one of the cards suggested if it is known
+    check_player(suggester, num_players)
+    check_cards(cards, len(card_to_catagory))
+    assert sorted(card_to_catagory[c] for c in cards) == sorted(set(card_to_catagory)), \
+    f"Suggestion {list(cards)} is not one card of each catagory"
+    assert type(passed) in (list, tuple), "passed must be a list"
+    for p in passed:
+        check_player(p, num_players)
+    assert suggester not in passed, "The suggester cannot pass on their own suggestion"
+    if shown_by != None:
+        check_player(shown_by, num_players)
+        assert shown_by != suggester and shown_by not in passed, f"Player {shown_by} cannot both show a card and pass"
+    assert shown == None or (shown_by != None and shown in cards), f"Card shown {shown} is not one of the cards suggested"